@@ -0,0 +1 @@
+"""Benchmarks of the dataset build hot paths; run with python -m bench."""
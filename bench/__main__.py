@@ -0,0 +1,67 @@
+import argparse
+import json
+import sys
+import time
+
+from bench.suite import BENCHMARKS, environment, fixture, git_commit, is_dirty, results_path, time_benchmark
+
+SCALES = [1, 10, 100]
+
+
+def load_results(rev: str) -> dict:
+    commit = git_commit(rev)
+    for dirty in (False, True):
+        path = results_path(commit, dirty)
+        if path.exists():
+            with open(path, "r") as f:
+                return json.load(f)
+    sys.exit(f"No benchmark results stored for {rev}, run python -m bench on that commit first")
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="python -m bench", description="Time the hot paths of the dataset build on generated fixtures, and store the results for the current commit")
+    parser.add_argument("benchmarks", nargs="*", help=f"Benchmarks to run, or name prefixes such as dgca/ (default: all of {', '.join(BENCHMARKS)})")
+    parser.add_argument("--scale", type=int, nargs="+", default=SCALES, help="Fixture scales to run at (default: 1 10 100)")
+    parser.add_argument("--repeat", type=int, default=3, help="Timed runs of every benchmark; the minimum is the figure to compare")
+    parser.add_argument("--jobs", type=int, default=1, help="Processes the DGCA builders and the MCA parser parse raw files with (default: 1, in-process)")
+    parser.add_argument("--compare", metavar="REV", default=None, help="Show the change against the results stored for another commit")
+    parser.add_argument("--no-save", action="store_true", help="Only print the results")
+    args = parser.parse_args()
+
+    names = [name for name in BENCHMARKS if not args.benchmarks or any(name.startswith(b) for b in args.benchmarks)]
+    if not names:
+        parser.error(f"no benchmark matches {', '.join(args.benchmarks)}")
+    baseline = load_results(args.compare)["results"] if args.compare else {}
+
+    commit, dirty = git_commit(), is_dirty()
+    results = {}
+    for scale in args.scale:
+        root = fixture(scale)
+        for name in names:
+            result = time_benchmark(name, root, args.repeat, args.jobs)
+            results.setdefault(str(scale), {})[name] = result
+
+            line = f"{name:<42} {scale:>4}x {result['min_s']:>9.3f}s  median {result['median_s']:.3f}s"
+            previous = baseline.get(str(scale), {}).get(name)
+            if previous:
+                line += f"  {result['min_s'] / previous['min_s']:.2f}x of {previous['min_s']:.3f}s"
+            print(line, flush=True)
+
+    if not args.no_save:
+        path = results_path(commit, dirty)
+        # Results of earlier runs on the same commit are kept for the scales and benchmarks not run again
+        stored = {}
+        if path.exists():
+            with open(path, "r") as f:
+                stored = json.load(f)["results"]
+        for scale, timings in results.items():
+            stored.setdefault(scale, {}).update(timings)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, "w") as f:
+            json.dump({"commit": commit, "dirty": dirty, "recorded_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+                       "repeat": args.repeat, "jobs": args.jobs, "environment": environment(), "results": stored}, f, indent=2)
+        print(f"Results written to {path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,304 @@
+"""Synthetic raw DGCA workbooks and MCA snapshots, at any scale.
+
+The generated tree has the layout the build scripts expect, so its folders can
+stand in for dgca/raw and mca/raw in load and scale tests:
+
+    <root>/dgca/raw/xlsx/domestic/       CITYPAIR monthly workbooks and carrier workbooks
+    <root>/dgca/raw/xlsx/international/  <yy>Q<n>_<table> quarterly workbooks
+    <root>/dgca/raw/csv/...              the same tables as ssconvert CSVs, as parse.sh writes them
+    <root>/mca/raw/civilaviation/        Wayback snapshots, in both dashboard layouts
+    <root>/aggregated/                   empty, for the table builders to write into
+
+The tables carry what the parsers have to cope with: title and unit rows above
+the header, '-' placeholders, carrier workbooks split into the four SCH/NON-SCH
+sections, and August 2015 without its serial and mail columns. Snapshots skip
+days, are sometimes captured twice a day, and sometimes lack the dashboard.
+
+At 1x the corpus holds a year of DGCA tables and a month of MCA snapshots.
+Larger scales add years (up to ten) and then grow the tables themselves, so
+100x has ten times as many files as 1x and ten times as many rows per file.
+Everything comes from fixed seeds, so a corpus only depends on its scale and
+VERSION.
+
+    python -m bench.corpus /tmp/corpus --scale 100 --format xlsx csv
+"""
+import argparse
+import csv
+import datetime
+import math
+import os
+import random
+from pathlib import Path
+
+import openpyxl
+
+# Bump whenever the generated files change, so cached benchmark fixtures are rebuilt
+VERSION = 3
+
+FIRST_YEAR = 2015
+MAX_YEARS = 10
+BASE_CITIES = 24
+BASE_AIRLINES = 6
+BASE_INTERNATIONAL_ROWS = 40
+BASE_SNAPSHOTS = 30
+FORMATS = ("xlsx", "csv")
+
+MONTHS = ["JANUARY", "FEBRUARY", "MARCH", "APRIL", "MAY", "JUNE", "JULY",
+          "AUGUST", "SEPTEMBER", "OCTOBER", "NOVEMBER", "DECEMBER"]
+CITIES = ["BENGALURU", "DELHI", "MUMBAI", "CHENNAI", "KOLKATA", "HYDERABAD", "PUNE", "GOA",
+          "KOCHI", "JAIPUR", "AHMEDABAD", "LUCKNOW", "PATNA", "BHUBANESWAR", "GUWAHATI", "SRINAGAR"]
+COUNTRIES = ["UAE", "QATAR", "SAUDI ARABIA", "SINGAPORE", "THAILAND", "UK", "USA", "GERMANY", "NEPAL", "SRI LANKA"]
+FOREIGN_CITIES = ["DUBAI", "DOHA", "ABU DHABI", "SINGAPORE", "BANGKOK", "LONDON", "FRANKFURT", "KATHMANDU"]
+CARRIER_SECTIONS = ["SCHEDULED DOMESTIC", "SCHEDULED INTERNATIONAL", "NON-SCHEDULED DOMESTIC", "NON SCHEDULED INTERNATIONAL"]
+
+# MCA dashboard fields as (category, item), with the spellings parse_dataframe merges grouped together.
+# A snapshot uses one spelling of each group, and the first snapshots cycle through all of them.
+MCA_FIELDS = [
+    [("Domestic Flight", "Arrival Flights"), ("Domestic", "Arriving Flights")],
+    [("Domestic Flight", "Departure Flights"), ("Domestic", "Departing Flights")],
+    [("Domestic Flight", "Arriving Pax")], [("Domestic Flight", "Departing Pax")],
+    [("Domestic traffic", "Aircraft Movements")], [("Domestic traffic", "Airport Footfalls")],
+    [("International Flight", "Arrival Flights"), ("International", "Arriving Flights")],
+    [("International Flight", "Departure Flights"), ("International", "Departing Flights")],
+    [("International Flight", "Arriving Pax")], [("International Flight", "Departing Pax")],
+    [("Cargo (In MT)", "Inbound (Dom)")], [("Cargo (In MT)", "Outbound (Int)")],
+    [("Airports", "State Govt./ Private"), ("Airports", "State Govt./Private")],
+    [("Grievances (by entity)", "Air Aisa India"), ("Grievances", "Air Asia Behrad"), ("Grievances", "Air Asia Berhad (Int.)"),
+     ("Grievances", "Airasia India"), ("Grievances", "Air Asia"), ("Grievances", "Air Asia Berhad"), ("Grievances", "Air Asia India")],
+    [("Grievances", "Air Seychelles"), ("Grievances", "Air Sychelles")],
+    [("Grievances", "Akasa  Air"), ("Grievances", "Akasa Air"), ("Grievances", "Akasa"), ("Grievances", "Akasha Air")],
+    [("Grievances", "Alliance Air"), ("Grievances", "Alliance  Air"), ("Grievances", "Alliance Air (India)"), ("Grievances", "Alliance")],
+    [("Grievances", "Delhi Airport"), ("Grievances", "Delhi  Airport"), ("Grievances", "Delhi")],
+    [("Grievances", "Egypt Air"), ("Grievances", "Egypt")],
+    [("Grievances", "Eminrates Airlines"), ("Grievances", "Emirates  Airline"), ("Grievances", "Emirates Airline"),
+     ("Grievances", "Emirates Airlines"), ("Grievances", "Emirates")],
+    [("Grievances", "Ethiopian Airlines"), ("Grievances", "Ethiopian")],
+    [("Grievances", "Etihad Airway"), ("Grievances", "Etihad Airways"), ("Grievances", "Etihad")],
+    [("Grievances", "Go Air"), ("Grievances", "Go First"), ("Grievances", "Goair"), ("Grievances", "Gofirst")],
+    [("Grievances", "Indi Go"), ("Grievances", "Indogo"), ("Grievances", "Indigo")],
+    [("Grievances", "Klm Airlines"), ("Grievances", "Klm")],
+    [("Grievances", "Malda Airport"), ("Grievances", "Malda")],
+    [("Grievances", "Malaysia Airlines"), ("Grievances", "Malaysia")],
+    [("Grievances", "Malindo  Airways"), ("Grievances", "Malindo Airways")],
+    [("Grievances", "Qatar Airways"), ("Grievances", "Qatar Airway"), ("Grievances", "Qatar")],
+    [("Grievances", "Singapore Airline"), ("Grievances", "Singapore Airlines")],
+    [("Grievances", "Srilankan Airlines"), ("Grievances", "Srilankan Airways")],
+    [("Grievances", "Swiss Air"), ("Grievances", "Swiss Airlines"), ("Grievances", "Swiss Airways")],
+    [("Grievances", "Viejet Air"), ("Grievances", "Viet Jet Air"), ("Grievances", "Viet Jet"),
+     ("Grievances", "Vietjet Air"), ("Grievances", "Vietjet"), ("Grievances", "Vietjetair")],
+    [("Grievances", "Virgin Atlantic"), ("Grievances", "Virgin Atlantica")],
+    [("Grievances", "Vistara Airlines"), ("Grievances", "Vistara")],
+    [("Grievances", "Received"), ("Grievances (by volume)", "Received (D)")],
+    [("Grievances (by type)", "Baggage"), ("Grievances", "Baggage")],
+    [("Pax Load Factor", "Go First"), ("Pax Load Factor", "Go First*")],
+    [("Pax Load Factor", "Air Asia India"), ("Pax Load Factor", "Aix Connect")],
+    [("Pax Load Factor", "Goair")],
+    [("Pax Load Factor", "Indigo")],
+    [("Krishi UDAN", "Others (Mt)"), ("Krishi UDAN", "Others")],
+    [("Krishi UDAN", "Perishable (Mt)"), ("Krishi UDAN", "Pershable")],
+    [("Krishi UDAN", "Total (Mt)"), ("Krishi UDAN", "Total")],
+    [("Skilling by IGRUA", "Students Pass Out"), ("Skilling by IGRUA", "Students Passout")],
+    [("UDAN (RCS)", "Subsidy"), ("UDAN (RCS)", "Viability Gap Funding")],
+    [("On Time Performance", "Go First"), ("On Time Performance", "Go First*"), ("On Time Performance", "Goair")],
+    [("On Time Performance", "Air Asia India"), ("On Time Performance", "Aix Connect")],
+    [("On Time Performance", "Indigo")],
+    [("Drones", "Exempted Orgn"), ("Drones", "Exempted Projects")],
+]
+
+
+def layout(scale: int) -> tuple:
+    """Years of data and the growth factor of each table, for a scale."""
+    years = min(scale, MAX_YEARS)
+    return years, max(scale // years, 1)
+
+
+def names(base: list, count: int, prefix: str) -> list:
+    # The real names first, then made-up ones; carrier names can't contain digits
+    extra = ["{} {}".format(prefix, "".join(chr(ord('A') + int(d)) for d in str(i))) for i in range(count)]
+    return (base + extra)[:count]
+
+
+def value(rng: random.Random):
+    r = rng.random()
+    if r < 0.1:
+        return "-"
+    return round(rng.uniform(0, 50), 2) if r < 0.5 else rng.randint(0, 5000)
+
+
+def write_csv(path: Path, rows: list):
+    # The CSV ssconvert writes for the first sheet: no header, empty cells for blanks
+    with open(path, "w", newline="") as f:
+        csv.writer(f).writerows(rows)
+
+
+def write_xlsx(path: Path, rows: list):
+    # DGCA workbooks often carry a notes sheet after the table, which the parsers must ignore
+    workbook = openpyxl.Workbook(write_only=True)
+    sheet = workbook.create_sheet("Sheet1")
+    for row in rows:
+        sheet.append(row)
+    notes = workbook.create_sheet("Notes")
+    notes.append(["Figures are provisional and subject to revision"])
+    workbook.save(path)
+
+
+def write_table(raw_dir: Path, folder: str, name: str, rows: list, formats: list):
+    for fmt in formats:
+        path = raw_dir / fmt / folder / "{}.{}".format(name, fmt)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        (write_xlsx if fmt == "xlsx" else write_csv)(path, rows)
+
+
+def title_rows(title: str, width: int) -> list:
+    # Every sheet opens with a title, a units line and a blank row before the header
+    return [[title] + [None] * (width - 1),
+            ["(Passengers in numbers, freight and mail in tonnes)"] + [None] * (width - 1),
+            [None] * width]
+
+
+def city_tables(rng: random.Random, years: int, growth: int):
+    cities = names(CITIES, round(BASE_CITIES * math.sqrt(growth)), "CITY")
+    for year in range(FIRST_YEAR, FIRST_YEAR + years):
+        for month in MONTHS[4:] if year == FIRST_YEAR else MONTHS:
+            rows = title_rows("DOMESTIC CITYPAIR DATA FOR {} {}".format(month, year), 9)
+            rows.append(["S.NO", "CITY 1", "CITY 2", "PASSENGERS TO CITY 2", "PASSENGERS FROM CITY 2",
+                         "FREIGHT TO CITY 2", "FREIGHT FROM CITY 2", "MAIL TO CITY 2", "MAIL FROM CITY 2"])
+            serial = 1
+            for a in cities:
+                for b in cities:
+                    if a < b and rng.random() < 0.5:
+                        rows.append([serial, " " + a if rng.random() < 0.2 else a, b] + [value(rng) for _ in range(6)])
+                        serial += 1
+            rows.append([None, "TOTAL", None] + [None] * 6)
+            # August 2015 was published without the serial and mail columns
+            if year == FIRST_YEAR and month == "AUGUST":
+                rows = [row[1:5] for row in rows]
+            yield "domestic", "DOM%20CITYPAIR%20DATA,%20{}%20{}".format(month, year), rows
+
+
+def carrier_tables(rng: random.Random, years: int, growth: int):
+    airlines = names(["indigo", "spicejet", "air india", "vistara", "totaldom", "alliance air"], BASE_AIRLINES * growth, "carrier")
+    for airline in airlines:
+        for year in range(FIRST_YEAR, FIRST_YEAR + years):
+            rows = title_rows("MONTHLY STATISTICS OF {} FOR {}".format(airline.upper(), year), 17)
+            for section in CARRIER_SECTIONS:
+                rows.append([section] + [None] * 16)
+                rows.append(["MONTH"] + ["COLUMN {}".format(i) for i in range(16)])
+                # Aircraft numbers are always whole, so the integer columns of the output are covered too
+                for month in MONTHS:
+                    rows.append([month + " " if rng.random() < 0.2 else month, rng.randint(0, 500)] + [value(rng) for _ in range(15)])
+                rows.append(["TOTAL", rng.randint(0, 6000)] + [value(rng) for _ in range(15)])
+            yield "domestic", "{}{}".format(airline, str(year)[2:]), rows
+
+
+def international_tables(rng: random.Random, years: int, growth: int):
+    count = BASE_INTERNATIONAL_ROWS * growth
+    airlines = names(["EMIRATES", "QATAR AIRWAYS", "LUFTHANSA", "AIR ARABIA", "SINGAPORE AIRLINES"], count, "AIRLINE")
+    countries = names(COUNTRIES, count, "COUNTRY")
+    pairs = [(FOREIGN_CITIES[i % len(FOREIGN_CITIES)], CITIES[(i // len(FOREIGN_CITIES)) % len(CITIES)]) for i in range(count)]
+
+    def measures(n):
+        return [rng.randint(0, 9000) if i % 4 < 2 else round(rng.uniform(0, 99), 2) for i in range(n)]
+
+    for year in range(FIRST_YEAR, FIRST_YEAR + years):
+        for quarter in range(1, 5):
+            tables = {
+                1: [["S.NO", "NAME OF THE AIRLINE", "PAX TO INDIA", "PAX FROM INDIA", "FREIGHT TO INDIA", "FREIGHT FROM INDIA"]]
+                   + [[i + 1, airline] + measures(4) for i, airline in enumerate(airlines)],
+                2: [["S.NO", "NAME OF THE AIRLINE"] + ["MONTH {} {}".format(m, i) for m in range(1, 4) for i in range(4)]]
+                   + [[i + 1, airline] + measures(12) for i, airline in enumerate(airlines)],
+                3: [["S.NO", "COUNTRY", "PAX TO INDIA", "PAX FROM INDIA", "FREIGHT TO INDIA", "FREIGHT FROM INDIA"]]
+                   + [[i + 1, country] + measures(4) for i, country in enumerate(countries)],
+                4: [["S.NO", "CITY 1", "CITY 2", "PAX TO CITY 2", "PAX FROM CITY 2", "FREIGHT TO CITY 2", "FREIGHT FROM CITY 2"]]
+                   + [[i + 1, a, b] + measures(4) for i, (a, b) in enumerate(pairs)],
+            }
+            for table, rows in tables.items():
+                title = title_rows("TABLE {} - QUARTER {} OF {}".format(table, quarter, year), len(rows[0]))
+                yield "international", "{}Q{}_{}".format(str(year)[2:], quarter, table), title + rows
+
+
+def snapshot_fields(rng: random.Random, number: int) -> list:
+    fields = [group[number % len(group)] if number < 8 else rng.choice(group) for group in MCA_FIELDS]
+    return [(category, item, "{:,}".format(rng.randint(0, 500000))) for category, item in fields]
+
+
+def airport_col_page(date: datetime.date, fields: list) -> str:
+    # Older dashboard: one div.airport-col per category, the date in the first heading
+    categories = {}
+    for category, item, number in fields:
+        categories.setdefault(category, []).append(
+            "<li><span>{}</span><span>{}</span></li>".format(item, number))
+    columns = []
+    for i, (category, items) in enumerate(categories.items()):
+        date_span = " <span>{}</span>".format(date.strftime("%d %B %Y")) if i == 0 else ""
+        columns.append('<div class="airport-col"><h2>{}{}</h2><ul>{}</ul></div>'.format(category, date_span, "".join(items)))
+    return page("".join(columns))
+
+
+def paragraph_page(date: datetime.date, fields: list) -> str:
+    # Newer dashboard: a div.paragraph per figure, four levels under its span.eng-title
+    blocks = []
+    for category, item, number in fields:
+        blocks.append('<section><span class="eng-title">{}</span><div><div><div><div class="paragraph">'
+                      '<div class="field--name-field-title">{}</div><div class="field--name-field-value">{}</div>'
+                      '</div></div></div></div></section>'.format(category, item, number))
+    date_widget = '<span class="date-widget">As on {}</span>'.format(date.strftime("%d %b %Y"))
+    return page(date_widget + "".join(blocks))
+
+
+def page(body: str) -> str:
+    # Wayback snapshots carry the site's navigation and scripts around the dashboard
+    nav = "".join('<li><a href="/en/page-{0}">Menu item {0}</a></li>'.format(i) for i in range(40))
+    script = "<script>var config = {};</script>".format("{" + ",".join('"k{0}": {0}'.format(i) for i in range(200)) + "}")
+    return ("<!DOCTYPE html><html><head><title>Ministry of Civil Aviation</title>{0}</head>"
+            "<body><nav><ul>{1}</ul></nav><main>{2}</main>{0}</body></html>").format(script, nav, body)
+
+
+def snapshots(html_dir: Path, rng: random.Random, count: int):
+    # Laid out as waybackpack saves them: <timestamp>/<host>/index.html
+    date = datetime.date(2020, 6, 1)
+    for number in range(count):
+        fields = snapshot_fields(rng, number)
+        if number % 25 == 24:
+            html = page("<p>The dashboard is being updated.</p>")
+        elif number % 2 == 0:
+            html = airport_col_page(date, fields)
+        else:
+            html = paragraph_page(date, fields)
+        # Some days are captured twice, the later capture wins; others are skipped altogether
+        timestamp = date.strftime("%Y%m%d") + ("180000" if number % 10 == 9 else "060000")
+        path = html_dir / timestamp / "www.civilaviation.gov.in" / "index.html"
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(html, encoding="utf-8")
+        if number % 10 != 8:
+            date += datetime.timedelta(days=rng.choice([1, 1, 1, 2, 3]))
+
+
+def generate(root: Path, scale: int, formats=FORMATS):
+    """Write the raw DGCA tables, in each of formats, and the MCA snapshots of a scale under root."""
+    years, growth = layout(scale)
+    raw_dir = root / "dgca" / "raw"
+    # A separate stream per table family, so changing one leaves the others as they were
+    for tables, family in ((city_tables, "city"), (carrier_tables, "carrier"), (international_tables, "international")):
+        for folder, name, rows in tables(random.Random(f"{family}-{scale}"), years, growth):
+            write_table(raw_dir, folder, name, rows, formats)
+    snapshots(root / "mca" / "raw" / "civilaviation", random.Random(f"mca-{scale}"), BASE_SNAPSHOTS * scale)
+    for folder in ("domestic", "international"):
+        os.makedirs(root / "aggregated" / folder, exist_ok=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="python -m bench.corpus", description="Generate a synthetic raw DGCA and MCA corpus for load and scale tests")
+    parser.add_argument("root", help="Directory to write the corpus into")
+    parser.add_argument("--scale", type=int, default=1, help="Size relative to a year of data (default: 1)")
+    parser.add_argument("--format", nargs="+", choices=FORMATS, default=list(FORMATS), help="Formats of the DGCA tables (default: xlsx csv)")
+    args = parser.parse_args()
+    if args.scale < 1:
+        parser.error("--scale must be at least 1")
+
+    generate(Path(args.root), args.scale, args.format)
+    print(f"Generated the {args.scale}x corpus in {args.root}")
+
+
+if __name__ == "__main__":
+    main()
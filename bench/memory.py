@@ -0,0 +1,156 @@
+"""Peak memory of every stage of the build, checked against budgets.
+
+Runs aggregate.py, mca/parse.py and viz/scripts/data.py one after the other,
+each in its own process with RSS sampling enabled (see pipeline.instrument),
+and reads the peak of every top-level step from their run reports. The peaks
+include the parse workers of aggregate.py and parse.py. A stage over its budget in
+bench/budgets.json fails the check, so a build that would not fit on a small
+runner is caught before it is scheduled there.
+
+By default the scripts run on a synthetic corpus (see bench.corpus); --real
+runs them on the raw data of this checkout, rewriting its aggregated tables.
+
+    python -m bench.memory --scale 10
+    python -m bench.memory --real --tracemalloc
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from bench.suite import ROOT, environment, fixture, git_commit, is_dirty, results_path
+
+MEMORY_DIR = ROOT / ".pipeline" / "bench" / "memory"
+BUDGETS_FILE = ROOT / "bench" / "budgets.json"
+SCRIPTS = ["aggregate", "mca-parse", "viz-data"]
+RSS_INTERVAL = 0.01
+
+
+def commands(root: Path, source: str, jobs: int | None, real: bool) -> dict:
+    """Working directory and command of each script, run on the corpus at root."""
+    aggregate = [sys.executable, str(ROOT / "dgca" / "aggregate.py"), "--source", source, "--no-cache"]
+    parse = [sys.executable, str(ROOT / "mca" / "parse.py")]
+    if jobs is not None:
+        aggregate += ["--jobs", str(jobs)]
+        parse += ["--jobs", str(jobs)]
+    viz = [sys.executable, str(ROOT / "viz" / "scripts" / "data.py")]
+    if not real:
+        viz += ["--aggregated-dir", str(root / "aggregated"), "--output-dir", str(root / "viz" / "static" / "data")]
+    return {
+        "aggregate": (root / "dgca", aggregate),
+        "mca-parse": (root / "mca", parse),
+        "viz-data": (ROOT / "viz", viz),
+    }
+
+
+def run_script(cwd: Path, command: list, report: Path, tracemalloc: bool) -> dict:
+    env = dict(os.environ, PIPELINE_REPORT=str(report), PIPELINE_RSS_INTERVAL=str(RSS_INTERVAL))
+    if tracemalloc:
+        env["PIPELINE_TRACEMALLOC"] = "1"
+    else:
+        env.pop("PIPELINE_TRACEMALLOC", None)
+    result = subprocess.run(command, cwd=cwd, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+    if result.returncode != 0:
+        sys.exit(f"{' '.join(command)} failed:\n{result.stderr}")
+    with open(report, "r") as f:
+        return json.load(f)
+
+
+def stage_peaks(report: dict) -> dict:
+    """Peak memory of the run and of each of its top-level steps, in MB."""
+    peaks = {}
+    for step in [report] + report["steps"]:
+        name = "(run)" if step is report else step["name"]
+        # Without /proc there is no sampled peak; the process peak so far is an upper bound
+        peaks[name] = {"rss_peak_mb": step.get("rss_peak_mb", step["peak_rss_mb"])}
+        if "tracemalloc_peak_mb" in step:
+            peaks[name]["tracemalloc_peak_mb"] = step["tracemalloc_peak_mb"]
+    return peaks
+
+
+def budget_of(budgets: dict, script: str, stage: str) -> float | None:
+    script_budgets = budgets.get(script, {})
+    return script_budgets.get(stage, script_budgets.get("default"))
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="python -m bench.memory", description="Record the peak memory of every build stage, and fail if one is over its budget")
+    parser.add_argument("scripts", nargs="*", help=f"Scripts to run, in order (default: {' '.join(SCRIPTS)})")
+    parser.add_argument("--scale", type=int, default=10, help="Scale of the synthetic corpus (default: 10)")
+    parser.add_argument("--real", action="store_true", help="Run on the raw data of this checkout instead of a synthetic corpus")
+    parser.add_argument("--source", choices=["xlsx", "csv"], default=None, help="Raw files aggregate.py reads (default: csv for the synthetic corpus, xlsx for --real)")
+    parser.add_argument("--jobs", type=int, default=None, help="Processes aggregate.py and parse.py parse raw files with (default: one per core)")
+    parser.add_argument("--tracemalloc", action="store_true", help="Also trace Python allocations; much slower, but shows what the RSS peak is made of")
+    parser.add_argument("--budgets", type=Path, default=BUDGETS_FILE, help="JSON file of the budgets, in MB, per script and stage")
+    parser.add_argument("--compare", metavar="REV", default=None, help="Show the change against the peaks stored for another commit")
+    parser.add_argument("--no-save", action="store_true", help="Only print the peaks")
+    args = parser.parse_args()
+    unknown = [script for script in args.scripts if script not in SCRIPTS]
+    if unknown:
+        parser.error(f"unknown script {', '.join(unknown)}, expected one of {', '.join(SCRIPTS)}")
+
+    with open(args.budgets, "r") as f:
+        budgets = json.load(f)
+    baseline = {}
+    if args.compare:
+        paths = [results_path(git_commit(args.compare), dirty, MEMORY_DIR) for dirty in (False, True)]
+        paths = [path for path in paths if path.exists()]
+        if not paths:
+            sys.exit(f"No memory results stored for {args.compare}, run python -m bench.memory on that commit first")
+        with open(paths[0], "r") as f:
+            baseline = json.load(f)["results"]
+
+    root = ROOT if args.real else fixture(args.scale)
+    source = args.source or ("xlsx" if args.real else "csv")
+    # Peaks are only comparable on the same corpus, so results are stored per corpus
+    corpus = f"real-{source}" if args.real else f"synthetic-x{args.scale}-{source}"
+    baseline = baseline.get(corpus, {})
+    scripts = commands(root, source, args.jobs, args.real)
+
+    results = {}
+    over = []
+    with tempfile.TemporaryDirectory(prefix="memory-") as report_dir:
+        for script in args.scripts or SCRIPTS:
+            cwd, command = scripts[script]
+            report = run_script(cwd, command, Path(report_dir) / f"{script}.json", args.tracemalloc)
+            results[script] = stage_peaks(report)
+
+            for stage, peaks in results[script].items():
+                budget = budget_of(budgets, script, stage)
+                rss = peaks["rss_peak_mb"]
+                line = f"{script:<10} {stage:<24} {rss:>8.1f} MB"
+                line += f"  budget {budget:>6.0f} MB" if budget is not None else "  no budget       "
+                if "tracemalloc_peak_mb" in peaks:
+                    line += f"  traced {peaks['tracemalloc_peak_mb']:.1f} MB"
+                previous = baseline.get(script, {}).get(stage)
+                if previous:
+                    line += f"  {rss - previous['rss_peak_mb']:+.1f} MB"
+                if budget is not None and rss > budget:
+                    line += "  OVER BUDGET"
+                    over.append(f"{script} {stage}")
+                print(line, flush=True)
+
+    if not args.no_save:
+        commit, dirty = git_commit(), is_dirty()
+        path = results_path(commit, dirty, MEMORY_DIR)
+        stored = {}
+        if path.exists():
+            with open(path, "r") as f:
+                stored = json.load(f)["results"]
+        stored.setdefault(corpus, {}).update(results)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, "w") as f:
+            json.dump({"commit": commit, "dirty": dirty, "recorded_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+                       "environment": environment(), "results": stored}, f, indent=2)
+        print(f"Results written to {path}")
+
+    if over:
+        sys.exit(f"Over budget: {', '.join(over)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,204 @@
+"""The benchmarked hot paths, and the runner that times them on a fixture.
+
+Each benchmark is registered with `@benchmark(name)`. It receives the fixture
+root, does its setup (untimed), and returns the callable that is timed. The
+DGCA benchmarks run with the fixture's dgca/ as working directory, as
+aggregate.py does, and write the aggregated tables the viz benchmarks read.
+"""
+import importlib.util
+import io
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+import warnings
+from contextlib import contextmanager, redirect_stdout
+from pathlib import Path
+
+from bench import corpus
+
+ROOT = Path(__file__).resolve().parent.parent
+BENCH_DIR = ROOT / ".pipeline" / "bench"
+FIXTURE_DIR = BENCH_DIR / "fixtures"
+RESULTS_DIR = BENCH_DIR / "results"
+
+# The DGCA scripts import each other by module name, from their own folder
+sys.path.insert(0, str(ROOT / "dgca"))
+
+BENCHMARKS = {}
+
+
+def benchmark(name: str):
+    def register(function):
+        BENCHMARKS[name] = function
+        return function
+    return register
+
+
+def load_script(name: str, path: Path):
+    # mca/parse.py and viz/scripts/data.py are scripts, not packages; import them under a unique name
+    # Registered in sys.modules, so their functions can be pickled for process pools
+    spec = importlib.util.spec_from_file_location(name, path)
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+@contextmanager
+def working_directory(path: Path):
+    previous = os.getcwd()
+    os.chdir(path)
+    try:
+        yield
+    finally:
+        os.chdir(previous)
+
+
+def fixture(scale: int) -> Path:
+    """The fixture of a scale, generated on first use and kept under .pipeline/bench/fixtures/."""
+    root = FIXTURE_DIR / f"x{scale}-v{corpus.VERSION}"
+    if not (root / ".complete").exists():
+        print(f"Generating the {scale}x fixture in {root}")
+        # The benchmarks read the CSVs, the workbooks would only cost generation time
+        corpus.generate(root, scale, formats=["csv"])
+        (root / ".complete").touch()
+    return root
+
+
+def dgca_index(root: Path) -> dict:
+    from index import build_index
+    with working_directory(root / "dgca"):
+        return build_index()
+
+
+@benchmark("dgca/csv_to_dataframe")
+def bench_csv_to_dataframe(root: Path, jobs: int):
+    from index import INTERNATIONAL_TABLES, query
+    from utils import csv_to_dataframe
+    kinds = ['city', 'carrier'] + ['international_{}'.format(table) for table in INTERNATIONAL_TABLES]
+    raw_files = query(dgca_index(root), 'csv', *kinds)
+
+    def run():
+        with working_directory(root / "dgca"):
+            for path, entry in raw_files:
+                csv_to_dataframe(path, entry)
+    return run
+
+
+@benchmark("dgca/domestic_table_city")
+def bench_domestic_table_city(root: Path, jobs: int):
+    from domestic import domestic_table_city
+    index = dgca_index(root)
+
+    def run():
+        with working_directory(root / "dgca"):
+            domestic_table_city(index, 'csv', jobs=jobs)
+    return run
+
+
+@benchmark("dgca/domestic_table_carrier")
+def bench_domestic_table_carrier(root: Path, jobs: int):
+    from domestic import domestic_table_carrier
+    index = dgca_index(root)
+
+    def run():
+        with working_directory(root / "dgca"):
+            domestic_table_carrier(index, 'csv', jobs=jobs)
+    return run
+
+
+@benchmark("dgca/international_tables")
+def bench_international_tables(root: Path, jobs: int):
+    from international import international_tables
+    index = dgca_index(root)
+
+    def run():
+        with working_directory(root / "dgca"):
+            international_tables(index, 'csv', jobs=jobs)
+    return run
+
+
+@benchmark("mca/generate_dataframe")
+def bench_generate_dataframe(root: Path, jobs: int):
+    parse = load_script("mca_parse", ROOT / "mca" / "parse.py")
+    parse.html_dir = str(root / "mca" / "raw" / "civilaviation")
+    return lambda: parse.generate_dataframe(jobs)
+
+
+@benchmark("mca/parse_dataframe")
+def bench_parse_dataframe(root: Path, jobs: int):
+    parse = load_script("mca_parse", ROOT / "mca" / "parse.py")
+    parse.html_dir = str(root / "mca" / "raw" / "civilaviation")
+    with redirect_stdout(io.StringIO()):
+        df = parse.generate_dataframe(jobs)
+    return lambda: parse.parse_dataframe(df.copy())
+
+
+def viz_data(root: Path):
+    data = load_script("viz_data", ROOT / "viz" / "scripts" / "data.py")
+    data.AGGREGATED_DIR = root / "aggregated"
+    data.OUTPUT_DIR = root / "viz" / "static" / "data"
+    data.ensure_output_dir()
+    # The viz reads the tables the DGCA builders write, so build those once
+    tables = [data.AGGREGATED_DIR / "domestic" / "city.csv", data.AGGREGATED_DIR / "domestic" / "carrier.csv",
+              data.AGGREGATED_DIR / "international" / "city.csv", data.AGGREGATED_DIR / "international" / "carrier.csv"]
+    if not all(table.exists() for table in tables):
+        with redirect_stdout(io.StringIO()):
+            for name in ("dgca/domestic_table_city", "dgca/domestic_table_carrier", "dgca/international_tables"):
+                BENCHMARKS[name](root, 1)()
+    return data
+
+
+@benchmark("viz/precalculate_airport_aggregations")
+def bench_airport_aggregations(root: Path, jobs: int):
+    data = viz_data(root)
+    domestic, international = data.convert_domestic_city(), data.convert_international_city()
+    return lambda: data.precalculate_airport_aggregations(domestic, international)
+
+
+@benchmark("viz/precalculate_airline_aggregations")
+def bench_airline_aggregations(root: Path, jobs: int):
+    data = viz_data(root)
+    domestic, international = data.convert_domestic_carrier(), data.convert_international_carrier()
+    return lambda: data.precalculate_airline_aggregations(domestic, international)
+
+
+def time_benchmark(name: str, root: Path, repeat: int, jobs: int) -> dict:
+    """Set up a benchmark on a fixture, and time `repeat` runs of it, silencing their output and warnings."""
+    with redirect_stdout(io.StringIO()), warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        run = BENCHMARKS[name](root, jobs)
+    times = []
+    for _ in range(repeat):
+        with redirect_stdout(io.StringIO()), warnings.catch_warnings():
+            warnings.simplefilter("ignore")
+            start = time.perf_counter()
+            run()
+            times.append(time.perf_counter() - start)
+    return {"min_s": round(min(times), 4), "median_s": round(statistics.median(times), 4),
+            "times_s": [round(t, 4) for t in times]}
+
+
+def git_commit(rev: str = "HEAD") -> str | None:
+    try:
+        return subprocess.run(["git", "rev-parse", rev], cwd=ROOT, capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def is_dirty() -> bool:
+    result = subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], cwd=ROOT, capture_output=True, text=True)
+    return bool(result.stdout.strip())
+
+
+def environment() -> dict:
+    return {"python": platform.python_version(), "platform": platform.platform(),
+            "cpus": os.cpu_count(), "machine": platform.machine()}
+
+
+def results_path(commit: str | None, dirty: bool, directory: Path = RESULTS_DIR) -> Path:
+    name = (commit or "unknown") + ("-dirty" if dirty else "")
+    return directory / f"{name}.json"
@@ -1,27 +1,125 @@
+import argparse
 import glob
 import numpy as np
 import os
 import pandas as pd
 import re
+import shutil
+import sys
 
+# pipeline/ is a package at the repository root, one folder up from this script
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from pipeline import instrument, profiling
+
+from cache import FrameCache
+from columnar import HAS_PYARROW, csv_to_parquet
+from database import export_database
+from partition import PARTITION_FILE, write_partitions
+from index import update_index
 from utils import *
 from domestic import *
 from international import *
 
-def dump_international():
+FRAME_CACHE_DIR = "cache/frames"
+
+def dump_international(index, source, cache, jobs):
     os.makedirs("aggregated/international", exist_ok=True)
 
-    for table in ['1', '2', '3', '4']:
-        international_table(table)
+    with instrument.step('international'):
+        return international_tables(index, source, cache, jobs)
 
-def dump_domestic():
+def dump_domestic(index, source, cache, jobs, chunk_files):
     os.makedirs("aggregated/domestic", exist_ok=True)
 
-    domestic_table_city()
-    domestic_table_carrier()
+    output_files = []
+    with instrument.step('domestic/city'):
+        output_files.append(domestic_table_city(index, source, cache, jobs, chunk_files))
+    with instrument.step('domestic/carrier'):
+        output_files.append(domestic_table_carrier(index, source, cache, jobs))
+    return output_files
+
+def partition_outputs(output_files):
+    # The single CSVs are kept next to their partitions, for the viz and the pipeline which read them
+    partitions = []
+    for output_file in output_files:
+        changed = write_partitions(output_file)
+        table_dir = os.path.splitext(output_file)[0]
+        print("{}: {} partitions updated".format(table_dir, len(changed)))
+        instrument.count('partitions_written', len(changed))
+        # Parquet copies of unchanged partitions are kept, unless they are missing
+        for partition in sorted(glob.glob(os.path.join(table_dir, 'year=*', PARTITION_FILE))):
+            if partition in changed or not os.path.exists(os.path.splitext(partition)[0] + '.parquet'):
+                partitions.append(partition)
+    return partitions
+
+def remove_partitions(output_files):
+    # Partitions left by an earlier partitioned run would be read instead of the fresh CSVs
+    for output_file in output_files:
+        table_dir = os.path.splitext(output_file)[0]
+        if os.path.isdir(table_dir):
+            shutil.rmtree(table_dir)
+            print("{}: removed the partitions of an earlier run".format(table_dir))
+
+def remove_parquet(output_files):
+    # Parquet copies left by an earlier run would no longer match their CSVs
+    for output_file in output_files:
+        table_dir = os.path.splitext(output_file)[0]
+        partitions = glob.glob(os.path.join(table_dir, 'year=*', PARTITION_FILE))
+        for csv_file in [output_file] + partitions:
+            parquet_file = os.path.splitext(csv_file)[0] + '.parquet'
+            if os.path.exists(parquet_file):
+                os.remove(parquet_file)
+
+def dump(source='xlsx', cache=None, jobs=None, reindex=False, chunk_files=None, parquet=True, layout='file', database=None):
+    # Refreshed on every run, so edited, added or removed raw files are never read from a stale
+    # entry; only files whose size or mtime changed are hashed again
+    with instrument.step('index'):
+        index = update_index(rehash=reindex)
+        instrument.count('files', len(index))
+
+    output_files = dump_international(index, source, cache, jobs)
+    output_files += dump_domestic(index, source, cache, jobs, chunk_files)
+
+    # Split each table into one CSV per year, only rewriting the years that changed
+    partitions = []
+    if layout == 'partitioned':
+        with instrument.step('partitions'):
+            partitions = partition_outputs(output_files)
+    else:
+        remove_partitions(output_files)
+
+    # Typed Parquet copies next to each CSV, for readers that would otherwise reparse the text
+    if parquet and HAS_PYARROW:
+        with instrument.step('parquet'):
+            for output_file in output_files + partitions:
+                csv_to_parquet(output_file)
+    else:
+        if parquet:
+            print("pyarrow is not installed, skipping the Parquet outputs")
+        remove_parquet(output_files)
+
+    # Every aggregated table, daily.csv included, in one indexed SQLite file for ad-hoc queries
+    if database:
+        with instrument.step('sqlite'):
+            export_database('../aggregated', database)
 
-def dump():
-    dump_international()
-    dump_domestic()
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Aggregate the raw DGCA files into combined CSV files")
+    parser.add_argument("--source", choices=["xlsx", "csv"], default="xlsx", help="Read the workbooks in raw/xlsx directly, or the ssconvert CSVs in raw/csv")
+    parser.add_argument("--jobs", type=int, default=None, help="Number of processes parsing raw files (default: one per core, 1 parses in-process)")
+    parser.add_argument("--cache-dir", default=FRAME_CACHE_DIR, help="Directory for parsed frames of unchanged raw files")
+    parser.add_argument("--no-cache", action="store_true", help="Parse every raw file again, without reading or writing the cache")
+    parser.add_argument("--reindex", action="store_true", help="Hash every raw file again, instead of only those whose size or mtime changed")
+    parser.add_argument("--chunk-files", type=int, default=None, help="Build domestic/city.csv from sorted runs of this many files, merged at the end, to bound memory")
+    parser.add_argument("--no-parquet", action="store_true", help="Only write the CSVs, without their Parquet copies")
+    parser.add_argument("--layout", choices=["file", "partitioned"], default="file", help="Write each table as a single CSV, or also as a folder with one CSV per year (year=YYYY/part.csv)")
+    parser.add_argument("--sqlite", metavar="PATH", default=None, help="Also export all aggregated tables into an indexed SQLite database at PATH")
+    parser.add_argument("--report", default=None, help="Path of the JSON run report (default: .pipeline/reports/aggregate-<time>.json)")
+    parser.add_argument("--profile", choices=profiling.MODES, default=None, help="Profile each stage into .pipeline/profiles/, with cProfile or a stack sampler")
+    args = parser.parse_args()
 
-dump()
+    cache = None if args.no_cache else FrameCache(args.cache_dir, version=PARSER_VERSION)
+    instrument.start("aggregate", args.profile)
+    jobs = profiling.profiled_jobs(args.jobs)
+    dump(args.source, cache, jobs, args.reindex, args.chunk_files, not args.no_parquet, args.layout, args.sqlite)
+    print("Run report written to {}".format(instrument.finish(args.report)))
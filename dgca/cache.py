@@ -0,0 +1,216 @@
+import hashlib
+import json
+import os
+import threading
+import time
+import pandas as pd
+from pathlib import Path
+
+# Response cache defaults
+DEFAULT_TTL = 24 * 60 * 60
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+
+# Existence cache defaults
+DEFAULT_NEGATIVE_TTL = 24 * 60 * 60
+
+
+def atomic_write(path: Path, data: bytes):
+    """Write data to path through a temporary file, so readers never see a partial file."""
+    tmp_path = path.with_name(path.name + ".tmp")
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+
+class ResponseCache:
+    """On-disk cache of DGCA API responses keyed by (contentId, serviceName).
+
+    Entries younger than `ttl` seconds are answered locally. Older entries are
+    revalidated: the stored ETag/Last-Modified validators are sent along, and a
+    response whose body hashes to the stored checksum only refreshes the entry's
+    timestamp. The least recently used entries are evicted once the cache grows
+    past `max_bytes`. With `refresh` set, cached entries are never served.
+    """
+    def __init__(self, directory, ttl: float = DEFAULT_TTL, max_bytes: int = DEFAULT_MAX_BYTES, refresh: bool = False):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.refresh = refresh
+        self.lock = threading.Lock()
+
+    def path(self, content_id: str, service_name: str) -> Path:
+        key = hashlib.sha256(f"{service_name}:{content_id}".encode()).hexdigest()
+        return self.directory / f"{key}.json"
+
+    def get(self, content_id: str, service_name: str) -> dict | None:
+        """Return the stored entry for a request, fresh or not, or None."""
+        if self.refresh:
+            return None
+        path = self.path(content_id, service_name)
+        try:
+            with open(path, "r") as f:
+                entry = json.load(f)
+            # Reads count as use for eviction
+            os.utime(path)
+        except (OSError, json.JSONDecodeError):
+            # Missing, unreadable, or evicted by another worker since it was read
+            return None
+        return entry
+
+    def is_fresh(self, entry: dict) -> bool:
+        return time.time() - entry["validated_at"] < self.ttl
+
+    def validators(self, entry: dict | None) -> dict:
+        """Conditional request headers for revalidating an entry."""
+        headers = {}
+        if entry is None:
+            return headers
+        if entry.get("etag"):
+            headers["If-None-Match"] = entry["etag"]
+        if entry.get("last_modified"):
+            headers["If-Modified-Since"] = entry["last_modified"]
+        return headers
+
+    def touch(self, content_id: str, service_name: str, entry: dict):
+        """Mark an entry as revalidated without changing its body."""
+        entry["validated_at"] = time.time()
+        atomic_write(self.path(content_id, service_name), json.dumps(entry).encode())
+
+    def put(self, content_id: str, service_name: str, body: str, headers=None) -> bool:
+        """Store a response body and return whether it differs from the cached one."""
+        headers = headers or {}
+        checksum = hashlib.sha256(body.encode()).hexdigest()
+        previous = None
+        path = self.path(content_id, service_name)
+        if path.exists():
+            try:
+                with open(path, "r") as f:
+                    previous = json.load(f)
+            except (OSError, json.JSONDecodeError):
+                previous = None
+
+        now = time.time()
+        changed = previous is None or previous.get("sha256") != checksum
+        entry = {
+            "content_id": content_id,
+            "service_name": service_name,
+            "sha256": checksum,
+            "etag": headers.get("ETag"),
+            "last_modified": headers.get("Last-Modified"),
+            "fetched_at": now if changed else previous["fetched_at"],
+            "validated_at": now,
+            "body": body,
+        }
+        atomic_write(path, json.dumps(entry).encode())
+        self.evict()
+        return changed
+
+    def evict(self):
+        """Delete least recently used entries until the cache fits in max_bytes."""
+        with self.lock:
+            entries = []
+            for path in self.directory.glob("*.json"):
+                try:
+                    stat = path.stat()
+                except OSError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, path))
+
+            total = sum(size for _, size, _ in entries)
+            for _, size, path in sorted(entries):
+                if total <= self.max_bytes:
+                    break
+                try:
+                    path.unlink()
+                except OSError:
+                    continue
+                total -= size
+
+
+class ExistenceCache:
+    """JSON file recording which remote objects exist.
+
+    Confirmed objects are remembered indefinitely, while missing objects are
+    only trusted for `negative_ttl` seconds, after which they are probed again.
+    """
+    def __init__(self, path, negative_ttl: float = DEFAULT_NEGATIVE_TTL, refresh: bool = False):
+        self.path = Path(path)
+        self.negative_ttl = negative_ttl
+        self.lock = threading.Lock()
+        self.entries = {}
+        if not refresh:
+            try:
+                with open(self.path, "r") as f:
+                    self.entries = json.load(f)
+            except (OSError, json.JSONDecodeError):
+                self.entries = {}
+
+    def get(self, url: str) -> bool | None:
+        """Return whether url is known to exist, or None if it has to be probed."""
+        with self.lock:
+            entry = self.entries.get(url)
+        if entry is None:
+            return None
+        if not entry["exists"] and time.time() - entry["checked_at"] >= self.negative_ttl:
+            return None
+        return entry["exists"]
+
+    def put(self, url: str, exists: bool):
+        with self.lock:
+            self.entries[url] = {"exists": exists, "checked_at": time.time()}
+
+    def save(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with self.lock:
+            data = json.dumps(self.entries, indent=2, sort_keys=True).encode()
+        atomic_write(self.path, data)
+
+
+def file_checksum(path) -> str:
+    """SHA-256 of a file's contents."""
+    checksum = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            checksum.update(chunk)
+    return checksum.hexdigest()
+
+
+class FrameCache:
+    """Parsed DataFrames of raw files, keyed by the file's content hash.
+
+    Frames are stored with pickle rather than Parquet/Feather: the raw sheets
+    are read without a schema, so columns mix strings and numbers, which only
+    pickle round-trips exactly. Entries also carry `version`, so bumping it
+    invalidates every frame parsed by older code.
+    """
+    def __init__(self, directory, version: int = 1):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.version = version
+
+    def prefix(self, raw_file, kind: str) -> str:
+        key = f"{Path(raw_file).name}:{kind}"
+        return hashlib.sha256(key.encode()).hexdigest()[:32]
+
+    def path(self, raw_file, kind: str, checksum: str) -> Path:
+        return self.directory / f"{self.prefix(raw_file, kind)}-{self.version}-{checksum[:32]}.pkl"
+
+    def get(self, raw_file, kind: str, checksum: str):
+        path = self.path(raw_file, kind, checksum)
+        if not path.exists():
+            return None
+        try:
+            return pd.read_pickle(path)
+        except Exception:
+            return None
+
+    def put(self, raw_file, kind: str, checksum: str, df):
+        path = self.path(raw_file, kind, checksum)
+        # Drop frames parsed from earlier versions of the same file
+        for stale in self.directory.glob(f"{self.prefix(raw_file, kind)}-*.pkl"):
+            if stale != path:
+                stale.unlink(missing_ok=True)
+        tmp_path = path.with_name(path.name + ".tmp")
+        df.to_pickle(tmp_path)
+        os.replace(tmp_path, path)
@@ -0,0 +1,95 @@
+import re
+
+import pandas as pd
+
+from pipeline import instrument
+from schema import SCHEMAS
+
+# Declarative cleaning rules for each aggregated table:
+#   columns: number of leading columns to keep
+#   header_markers: text identifying repeated header cells, which are blanked out
+#   required: number of leading columns that must be filled for a row to be kept ('all' for every column;
+#             blanks in the schema's numeric columns are dropped before typing, see schema.drop_blank)
+#   placeholders: cell values standing in for another value
+CLEANING_SPECS = {
+    'domestic_city': {
+        'columns': 11,
+        'header_markers': ["NAME OF THE AIRLINE", "TO CITY"],
+        'required': 4,
+        'placeholders': {'-': '0'},
+    },
+    'domestic_carrier': {
+        'placeholders': {'-': '0'},
+    },
+    'international_1': {
+        'header_markers': ["NAME OF THE AIRLINE", "FROM INDIA", "FROM CITY"],
+        'required': 'all',
+    },
+    'international_2': {
+        'header_markers': ["NAME OF THE AIRLINE", "FROM INDIA", "FROM CITY"],
+        'required': 'all',
+    },
+    'international_3': {
+        'header_markers': ["NAME OF THE AIRLINE", "FROM INDIA", "FROM CITY"],
+        'required': 'all',
+    },
+    'international_4': {
+        'columns': 9,
+        'header_markers': ["NAME OF THE AIRLINE", "FROM INDIA", "FROM CITY"],
+        'required': 'all',
+    },
+}
+
+
+def compile_spec(spec):
+    compiled = dict(spec)
+    if spec.get('header_markers'):
+        compiled['header_pattern'] = re.compile('|'.join(re.escape(marker) for marker in spec['header_markers']))
+    return compiled
+
+
+COMPILED_SPECS = {name: compile_spec(spec) for name, spec in CLEANING_SPECS.items()}
+
+
+def text_columns(df):
+    # Only object/string columns can hold header text or placeholders
+    return [col for col in df.columns if df[col].dtype == object or pd.api.types.is_string_dtype(df[col])]
+
+
+def clean_table(df, name):
+    spec = COMPILED_SPECS[name]
+
+    if 'columns' in spec:
+        df = df.iloc[:, :spec['columns']]
+
+    # Blank out header cells: the pattern only runs over each column's distinct values,
+    # and the matches are mapped back with one vectorized isin per column
+    if 'header_pattern' in spec:
+        df = df.copy()
+        for col in text_columns(df):
+            markers = [value for value in df[col].unique() if isinstance(value, str) and spec['header_pattern'].search(value)]
+            if markers:
+                df[col] = df[col].mask(df[col].isin(markers))
+
+    rows = len(df)
+    if spec.get('required') == 'all':
+        numeric = SCHEMAS.get(name, {}).get('numeric', [])
+        df = df.dropna(subset=[col for col in df.columns if col not in numeric])
+    elif spec.get('required'):
+        df = df.dropna(subset=df.columns[:spec['required']].tolist(), how='any')
+    instrument.dropped('required columns', rows, len(df))
+
+    return df
+
+
+def replace_placeholders(df, name):
+    spec = COMPILED_SPECS[name]
+
+    df = df.copy()
+    for col in text_columns(df):
+        for placeholder, value in spec.get('placeholders', {}).items():
+            is_placeholder = df[col].eq(placeholder)
+            if is_placeholder.any():
+                df[col] = df[col].mask(is_placeholder, value)
+
+    return df
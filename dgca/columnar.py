@@ -0,0 +1,71 @@
+import importlib.util
+import os
+
+import pandas as pd
+
+# Parquet copies of the aggregated tables need pyarrow, which is optional
+HAS_PYARROW = importlib.util.find_spec('pyarrow') is not None
+
+# Repeated labels are dictionary encoded, periods are small integers, everything else is a float measure
+DICTIONARY_COLUMNS = ['Type', 'Airline', 'City1', 'City2', 'Country']
+INTEGER_COLUMNS = {'Year': 'int16', 'Month': 'int8', 'Quarter': 'int8'}
+CHUNK_ROWS = 100000
+
+
+def normalise_year(years):
+    # International tables carry two-digit years; works on a single year or a column of them
+    return years + 2000 * (years < 100)
+
+
+def parquet_schema(columns):
+    import pyarrow as pa
+
+    fields = []
+    for col in columns:
+        if col in DICTIONARY_COLUMNS:
+            fields.append(pa.field(col, pa.dictionary(pa.int32(), pa.string())))
+        elif col in INTEGER_COLUMNS:
+            fields.append(pa.field(col, getattr(pa, INTEGER_COLUMNS[col])()))
+        else:
+            fields.append(pa.field(col, pa.float64()))
+    return pa.schema(fields)
+
+
+def typed_chunk(chunk):
+    for col in chunk.columns:
+        if col in DICTIONARY_COLUMNS:
+            continue
+        values = pd.to_numeric(chunk[col], errors='coerce')
+        if col == 'Year':
+            values = normalise_year(values)
+        if col in INTEGER_COLUMNS:
+            values = values.astype(INTEGER_COLUMNS[col].capitalize())
+        chunk[col] = values
+    return chunk
+
+
+def csv_to_parquet(csv_file, parquet_file=None, chunk_rows=CHUNK_ROWS):
+    """Write a typed Parquet copy of an aggregated CSV next to it, a chunk of rows at a time."""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    parquet_file = parquet_file or os.path.splitext(csv_file)[0] + '.parquet'
+    tmp_file = parquet_file + '.tmp'
+    labels = {col: str for col in DICTIONARY_COLUMNS}
+
+    writer = None
+    try:
+        for chunk in pd.read_csv(csv_file, dtype=labels, keep_default_na=False, na_values=[''], chunksize=chunk_rows):
+            if writer is None:
+                schema = parquet_schema(chunk.columns)
+                writer = pq.ParquetWriter(tmp_file, schema)
+            table = pa.Table.from_pandas(typed_chunk(chunk), preserve_index=False)
+            writer.write_table(table.cast(schema))
+    finally:
+        if writer is not None:
+            writer.close()
+
+    if writer is None:
+        return None
+    os.replace(tmp_file, parquet_file)
+    return parquet_file
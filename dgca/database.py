@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+
+import argparse
+import os
+import sqlite3
+
+import pandas as pd
+
+from columnar import CHUNK_ROWS, DICTIONARY_COLUMNS, typed_chunk
+from partition import table_files
+
+# Constants
+AGGREGATED_DIR = "../aggregated"
+DATABASE_FILE = "../aggregated/aggregated.sqlite"
+
+# Database tables, and the aggregated table each one is loaded from
+TABLES = {
+    'domestic_city': 'domestic/city',
+    'domestic_carrier': 'domestic/carrier',
+    'international_city': 'international/city',
+    'international_country': 'international/country',
+    'international_carrier': 'international/carrier',
+    'international_carrier_quarterly': 'international/carrier_quarterly',
+    'daily': 'daily',
+}
+
+# Indexed columns, the first of each that a table has: slices are by name, then period
+INDEX_COLUMNS = [('City1', 'Airline', 'Country'), ('City2',), ('Year',), ('Month', 'Quarter')]
+
+
+def index_columns(columns):
+    if 'Date' in columns:
+        return ['Date']
+    indexed = []
+    for candidates in INDEX_COLUMNS:
+        indexed += [col for col in candidates if col in columns][:1]
+    return indexed
+
+
+def typed_rows(chunk):
+    # Same types as the Parquet copies; dates of the daily reports stay ISO text
+    if 'Date' not in chunk.columns:
+        return typed_chunk(chunk)
+    return pd.concat([chunk[['Date']], typed_chunk(chunk.drop(columns='Date'))], axis=1)
+
+
+def load_table(connection, name, csv_files, chunk_rows=CHUNK_ROWS):
+    labels = {col: str for col in DICTIONARY_COLUMNS + ['Date']}
+    columns = None
+    for csv_file in csv_files:
+        for chunk in pd.read_csv(csv_file, dtype=labels, keep_default_na=False, na_values=[''], chunksize=chunk_rows):
+            columns = columns or list(chunk.columns)
+            typed_rows(chunk).to_sql(name, connection, if_exists='append', index=False)
+
+    if columns is None:
+        return 0
+
+    indexed = index_columns(columns)
+    if indexed:
+        connection.execute('CREATE INDEX "idx_{}" ON "{}" ({})'.format(
+            name, name, ', '.join('"{}"'.format(col) for col in indexed)))
+    return connection.execute('SELECT COUNT(*) FROM "{}"'.format(name)).fetchone()[0]
+
+
+def export_database(aggregated_dir=AGGREGATED_DIR, database_file=DATABASE_FILE):
+    """Load every aggregated table, in either layout, into a single indexed SQLite file.
+
+    The database is built under a temporary name and moved into place when complete.
+    """
+    tmp_file = database_file + '.tmp'
+    if os.path.exists(tmp_file):
+        os.remove(tmp_file)
+
+    connection = sqlite3.connect(tmp_file)
+    try:
+        for name, table in TABLES.items():
+            csv_files = table_files(os.path.join(aggregated_dir, table))
+            if not csv_files:
+                print("Skipping {}, {} not found".format(name, table))
+                continue
+            rows = load_table(connection, name, csv_files)
+            print("Loaded {} rows into {}".format(rows, name))
+        connection.commit()
+    finally:
+        connection.close()
+
+    os.replace(tmp_file, database_file)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export the aggregated tables into an indexed SQLite database")
+    parser.add_argument("--aggregated-dir", default=AGGREGATED_DIR, help="Folder with the aggregated tables")
+    parser.add_argument("--output", default=DATABASE_FILE, help="SQLite file to write")
+    args = parser.parse_args()
+
+    export_database(args.aggregated_dir, args.output)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,31 +1,30 @@
+import csv
 import glob
+import heapq
 import numpy as np
 import os
 import pandas as pd
 import re
+import tempfile
 
+from cleaning import *
+from index import query
+from pipeline import instrument
+from schema import restore_integers
 from utils import *
 
-def domestic_table_city():
-    directory_path = './raw/csv/domestic'
-
-    pattern = f'{directory_path}/**/*CITYPAIR*.csv'
-    csv_files = glob.glob(pattern, recursive=True)
-
-    dataframes = []
-    for csv_file in csv_files:
-        df = csv_to_dataframe(csv_file, domestic=True, table='city')
-        if df is not None:
-            dataframes.append(df)
+CITY_COLUMNS = ['Year', 'Month', 'City1', 'City2', 'PaxToCity2', 'PaxFromCity2', 'FreightToCity2', 'FreightFromCity2', 'MailToCity2', 'MailFromCity2']
+CITY_MEASURES = CITY_COLUMNS[4:]
+CITY_FLOAT_FORMAT = '{:.2f}'.format
 
+def city_run(dataframes):
+    # Runs always have the full layout of serial number, city pair, six measures, Year and Month,
+    # even if every file in a chunk has fewer columns
     combined_df = pd.concat(dataframes)
+    combined_df = combined_df.reindex(columns=list(range(9)) + ['Year', 'Month'])
+    instrument.count('rows_in', len(combined_df))
 
-    combined_df = combined_df.iloc[:, :11]
-    combined_df = combined_df[~combined_df.map(lambda x: isinstance(x, str) and "NAME OF THE AIRLINE" in x)]
-    combined_df = combined_df[~combined_df.map(lambda x: isinstance(x, str) and "TO CITY" in x)]
-
-    fingerprint_columns = combined_df.columns[:4].tolist()
-    combined_df = combined_df.dropna(subset=fingerprint_columns, how='any')
+    combined_df = clean_table(combined_df, 'domestic_city')
 
     combined_df.drop(columns=combined_df.columns[0], axis=1, inplace=True)
 
@@ -39,43 +38,70 @@ def domestic_table_city():
     combined_df['City1'] = combined_df['City1'].str.lstrip()
     combined_df['City2'] = combined_df['City2'].str.lstrip()
 
-    combined_df.sort_values(by=['City1', 'City2', 'Year', 'Month'], inplace=True)
-
-    combined_df = combined_df.map(lambda x: '0' if isinstance(x, str) and x == '-' else x)
-
-    combined_df['PaxToCity2'] = pd.to_numeric(combined_df['PaxToCity2'], errors='coerce')
-    combined_df['PaxFromCity2'] = pd.to_numeric(combined_df['PaxFromCity2'], errors='coerce')
-    combined_df['FreightToCity2'] = pd.to_numeric(combined_df['FreightToCity2'], errors='coerce')
-    combined_df['FreightFromCity2'] = pd.to_numeric(combined_df['FreightFromCity2'], errors='coerce')
-    combined_df['MailToCity2'] = pd.to_numeric(combined_df['MailToCity2'], errors='coerce')
-    combined_df['MailFromCity2'] = pd.to_numeric(combined_df['MailFromCity2'], errors='coerce')
-    float_format = '{:.2f}'.format
-
-    columns = list(combined_df.columns)
-
-    columns.remove('Year')
-    columns.insert(0, 'Year')
-
-    columns.remove('Month')
-    columns.insert(1, 'Month')
-
-    combined_df = combined_df.reindex(columns=columns)
-
-    combined_df.to_csv('../aggregated/domestic/city.csv', index=False, float_format=float_format)
-
-def domestic_table_carrier():
-    directory_path = './raw/csv/domestic'
-
-    all_files = glob.glob(f'{directory_path}/**/*', recursive=True)
-    csv_files = [f for f in all_files if "CITYPAIR" not in f]
-
-    dataframes = []
-    for csv_file in csv_files:
-        df = csv_to_dataframe(csv_file, domestic=True, table='carrier')
-        if df is not None:
-            dataframes.append(df)
+    # Stable, so rows with equal keys keep the order of the files they came from
+    combined_df.sort_values(by=['City1', 'City2', 'Year', 'Month'], kind='stable', inplace=True)
+
+    combined_df = replace_placeholders(combined_df, 'domestic_city')
+
+    # Always floats, so every run is formatted alike
+    combined_df[CITY_MEASURES] = combined_df[CITY_MEASURES].astype(float)
+    instrument.count('rows_out', len(combined_df))
+
+    return combined_df.reindex(columns=CITY_COLUMNS)
+
+def merge_city_runs(run_files, output_file):
+    # k-way merge of the sorted runs; on equal keys heapq.merge takes the earlier run first
+    run_handles = [open(run_file, 'r', newline='') for run_file in run_files]
+    try:
+        runs = [csv.reader(handle) for handle in run_handles]
+        with open(output_file, 'w', newline='') as f:
+            writer = csv.writer(f, lineterminator='\n')
+            writer.writerow(CITY_COLUMNS)
+            writer.writerows(heapq.merge(*runs, key=lambda row: (row[2], row[3], row[0], row[1])))
+    finally:
+        for handle in run_handles:
+            handle.close()
+
+def domestic_table_city(index, source='xlsx', cache=None, jobs=None, chunk_files=None):
+    raw_files = query(index, source, 'city')
+    output_file = '../aggregated/domestic/city.csv'
+    instrument.count('files', len(raw_files))
+
+    # Without chunk_files the whole corpus is a single run, written out directly
+    if not chunk_files or len(raw_files) <= chunk_files:
+        with instrument.step('load'):
+            dataframes = load_dataframes(raw_files, cache=cache, jobs=jobs)
+        with instrument.step('transform'):
+            combined_df = city_run(dataframes)
+        with instrument.step('write'):
+            combined_df.to_csv(output_file, index=False, float_format=CITY_FLOAT_FORMAT)
+        return output_file
+
+    # Otherwise only chunk_files files are in memory at a time, each chunk is written as a sorted run
+    with tempfile.TemporaryDirectory(prefix='city-runs-') as run_dir:
+        run_files = []
+        for start in range(0, len(raw_files), chunk_files):
+            with instrument.step('run {}'.format(len(run_files))):
+                dataframes = load_dataframes(raw_files[start:start + chunk_files], cache=cache, jobs=jobs)
+                run_file = os.path.join(run_dir, '{:06d}.csv'.format(len(run_files)))
+                city_run(dataframes).to_csv(run_file, index=False, header=False, float_format=CITY_FLOAT_FORMAT)
+                run_files.append(run_file)
+                del dataframes
+
+        with instrument.step('merge'):
+            merge_city_runs(run_files, output_file)
+
+    return output_file
+
+def domestic_table_carrier(index, source='xlsx', cache=None, jobs=None):
+    raw_files = query(index, source, 'carrier')
+    instrument.count('files', len(raw_files))
+
+    with instrument.step('load'):
+        dataframes = load_dataframes(raw_files, cache=cache, jobs=jobs)
 
     combined_df = pd.concat(dataframes)
+    instrument.count('rows_in', len(combined_df))
 
     # Filter rows where the first column contains any month name
     months = ['january', 'february', 'march', 'april', 'may', 'june',
@@ -83,21 +109,23 @@ def domestic_table_carrier():
               'JAN', 'FEB', 'MAR', 'APR', 'MAY', 'JUN'
               'JUL', 'AUG', 'SEP', 'OCT', 'NOV', 'DEC',
               'JUNE', 'JULY']
+    rows = len(combined_df)
     combined_df = combined_df[combined_df[combined_df.columns[0]].str.contains('|'.join(months), na=False)]
+    instrument.dropped('month rows', rows, len(combined_df))
 
     combined_df = combined_df.iloc[:, :20]
     fingerprint_columns = combined_df.columns[:4].tolist()
+    rows = len(combined_df)
     combined_df = combined_df.dropna(subset=fingerprint_columns, how='any')
+    instrument.dropped('required columns', rows, len(combined_df))
 
     combined_df.columns = ['Month', 'Aircraft Number', 'Aircraft Hours', 'Aircraft Kilometres', 'Passenger Number', 'Passenger Kilometers', 'Seat Kilometers', 'Passenger Load Factor', 'Freight', 'Mail', 'Total Cargo', 'Passenger Tonne Kilometer', 'Mail Tonne Kilometer', 'Freight Tonne Kilometer', 'Total Tonne Kilometer', 'Available Tonne Kilometer', 'Weight Load Factor', 'Year', 'Airline', 'Type']
 
     combined_df['Month'] = combined_df['Month'].str.rstrip()
     combined_df['Month'] = combined_df['Month'].replace(month_mapping)
-    combined_df['Airline'] = combined_df['Airline'].str.replace('\d+', '', regex=True)
-    combined_df['Airline'] = combined_df['Airline'].replace(airline_mapping)
 
     combined_df.sort_values(by=['Type', 'Airline', 'Year', 'Month'], inplace=True)
-    combined_df = combined_df.map(lambda x: '0' if isinstance(x, str) and x == '-' else x)
+    combined_df = replace_placeholders(combined_df, 'domestic_carrier')
 
     columns = list(combined_df.columns)
 
@@ -114,11 +142,13 @@ def domestic_table_carrier():
     columns.insert(3, 'Month')
 
     combined_df = combined_df.reindex(columns=columns)
+    combined_df = restore_integers(combined_df, columns[4:20])
 
     float_format = '{:.3f}'.format
-    for col in combined_df.columns[4:20]:
-        combined_df[col] = pd.to_numeric(combined_df[col], errors='coerce')
+    instrument.count('rows_out', len(combined_df))
 
-    print(combined_df)
+    output_file = '../aggregated/domestic/carrier.csv'
+    with instrument.step('write'):
+        combined_df.to_csv(output_file, index=False, float_format=float_format)
 
-    combined_df.to_csv('../aggregated/domestic/carrier.csv', index=False, float_format=float_format)
+    return output_file
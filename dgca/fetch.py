@@ -0,0 +1,210 @@
+#!/usr/bin/env python3
+
+import argparse
+import hashlib
+import json
+import os
+import sys
+import threading
+import time
+import requests
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from pathlib import Path
+from requests.adapters import HTTPAdapter
+
+from cache import atomic_write
+from index import update_index
+
+# Constants
+URLS_FILE = "urls.txt"
+OUTPUT_DIR = "raw/xlsx"
+MANIFEST_FILE = "manifest.json"
+DEFAULT_WORKERS = 8
+CHUNK_SIZE = 64 * 1024
+TIMEOUT = 60
+
+
+def destination_for(url: str, output_dir: Path) -> Path:
+    """Local path for a URL, split into domestic and international folders like fetch.sh did."""
+    filename = url.rsplit("/", 1)[-1]
+    folder = "domestic" if "domestic" in url else "international"
+    return output_dir / folder / filename
+
+
+def load_manifest(path: Path) -> dict:
+    """Load the download manifest, mapping local paths to size, checksum and validators."""
+    try:
+        with open(path, "r") as f:
+            return json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return {}
+
+
+def save_manifest(path: Path, manifest: dict):
+    """Atomically save the download manifest, unless it is unchanged.
+
+    The pipeline fingerprints raw/xlsx by mtime, so rewriting an identical
+    manifest would rebuild every stage downstream of the fetch.
+    """
+    data = json.dumps(manifest, indent=2, sort_keys=True).encode()
+    try:
+        if path.read_bytes() == data:
+            return
+    except OSError:
+        pass
+    atomic_write(path, data)
+
+
+def make_session(workers: int) -> requests.Session:
+    """Session whose keep-alive connection pool is large enough for every worker."""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=workers, pool_maxsize=workers)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+def download(session: requests.Session, url: str, dest: Path, entry: dict | None) -> dict | None:
+    """Download url to dest and return its manifest entry, or None if it is unchanged.
+
+    Existing files recorded in the manifest are revalidated with a conditional GET.
+    Data is written to a .part file which is resumed with a Range request if a
+    previous download was interrupted, and only renamed into place once complete.
+    """
+    dest.parent.mkdir(parents=True, exist_ok=True)
+    part = dest.with_name(dest.name + ".part")
+    part_meta = dest.with_name(dest.name + ".part.json")
+
+    headers = {}
+    intact = entry is not None and dest.exists() and dest.stat().st_size == entry["size"]
+    if intact:
+        if entry.get("etag"):
+            headers["If-None-Match"] = entry["etag"]
+        if entry.get("last_modified"):
+            headers["If-Modified-Since"] = entry["last_modified"]
+
+    # Resume an interrupted download, unless the object changed in the meantime
+    offset = part.stat().st_size if part.exists() else 0
+    validator = None
+    if offset and part_meta.exists():
+        with open(part_meta, "r") as f:
+            meta = json.load(f)
+        validator = meta.get("etag") or meta.get("last_modified")
+    if offset and validator:
+        headers["Range"] = f"bytes={offset}-"
+        headers["If-Range"] = validator
+    else:
+        offset = 0
+
+    with session.get(url.replace(" ", "%20"), headers=headers, stream=True, timeout=TIMEOUT) as response:
+        if response.status_code == 304 and intact:
+            return None
+        response.raise_for_status()
+
+        if response.status_code == 206:
+            expected = int(response.headers["Content-Range"].rsplit("/", 1)[-1])
+            mode = "ab"
+        else:
+            offset = 0
+            expected = int(response.headers["Content-Length"]) if "Content-Length" in response.headers else None
+            mode = "wb"
+
+        etag = response.headers.get("ETag")
+        last_modified = response.headers.get("Last-Modified")
+        with open(part_meta, "w") as f:
+            json.dump({"etag": etag, "last_modified": last_modified}, f)
+
+        with open(part, mode) as f:
+            for chunk in response.iter_content(CHUNK_SIZE):
+                f.write(chunk)
+
+    size = part.stat().st_size
+    if expected is not None and size != expected:
+        raise IOError(f"truncated download: got {size} of {expected} bytes")
+
+    checksum = hashlib.sha256()
+    with open(part, "rb") as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b""):
+            checksum.update(chunk)
+
+    os.replace(part, dest)
+    part_meta.unlink()
+
+    return {
+        "url": url,
+        "size": size,
+        "sha256": checksum.hexdigest(),
+        "etag": etag,
+        "last_modified": last_modified,
+        "fetched_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+    }
+
+
+def fetch_all(urls: list, output_dir: Path, workers: int = DEFAULT_WORKERS) -> dict:
+    """Download every URL with a pool of workers sharing one keep-alive session."""
+    manifest_path = output_dir / MANIFEST_FILE
+    manifest = load_manifest(manifest_path)
+    lock = threading.Lock()
+    counts = {"downloaded": 0, "unchanged": 0, "failed": 0}
+
+    def fetch_one(url):
+        dest = destination_for(url, output_dir)
+        key = dest.relative_to(output_dir).as_posix()
+        with lock:
+            entry = manifest.get(key)
+        try:
+            new_entry = download(session, url, dest, entry)
+        except Exception as e:
+            print(f"Failed {url}: {e}")
+            with lock:
+                counts["failed"] += 1
+            return
+
+        with lock:
+            if new_entry is None:
+                counts["unchanged"] += 1
+            else:
+                print(f"Fetched {key} ({new_entry['size']} bytes)")
+                manifest[key] = new_entry
+                counts["downloaded"] += 1
+
+    session = make_session(workers)
+    try:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            for future in as_completed([executor.submit(fetch_one, url) for url in urls]):
+                future.result()
+    finally:
+        output_dir.mkdir(parents=True, exist_ok=True)
+        save_manifest(manifest_path, manifest)
+
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fetch the raw XLSX files listed in urls.txt from DGCA")
+    parser.add_argument("--urls", default=URLS_FILE, help="File with one URL per line")
+    parser.add_argument("--output", default=OUTPUT_DIR, help="Directory to download the workbooks into")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS, help="Number of parallel downloads")
+    args = parser.parse_args()
+
+    with open(args.urls, "r") as f:
+        urls = [line.strip() for line in f if line.strip()]
+
+    output_dir = Path(args.output)
+    counts = fetch_all(urls, output_dir, args.workers)
+    print(f"Done! {counts['downloaded']} downloaded, {counts['unchanged']} unchanged, {counts['failed']} failed")
+
+    # Refresh the raw file index, reusing the checksums computed while downloading
+    raw_dir = output_dir.parent
+    manifest = load_manifest(output_dir / MANIFEST_FILE)
+    checksums = {(output_dir / key).as_posix(): entry["sha256"] for key, entry in manifest.items()}
+    index = update_index(raw_dir.as_posix(), (raw_dir / "index.json").as_posix(), checksums)
+    print(f"Indexed {len(index)} raw files")
+
+    # The corpus is incomplete, so the stages aggregating it must not run; a re-run only fetches the failures
+    if counts["failed"]:
+        sys.exit(f"{counts['failed']} downloads failed")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+
+import argparse
+import json
+import os
+import re
+from pathlib import Path
+
+from cache import atomic_write, file_checksum
+from utils import airline_mapping, map_string_to_date
+
+# Constants
+RAW_DIR = "raw"
+INDEX_FILE = "raw/index.json"
+RAW_EXTENSIONS = {
+    'xlsx': ('.xlsx', '.xls'),
+    'csv': ('.csv',),
+}
+INTERNATIONAL_TABLES = ['1', '2', '3', '4']
+
+
+def describe(path: str, raw_dir=RAW_DIR) -> dict:
+    """Metadata of a raw file, derived once from its path: <raw_dir>/<source>/<folder>/.../<name>.
+
+    `kind` is one of city, carrier or international_<N>, or None for files no table reads.
+    """
+    parts = Path(path).relative_to(raw_dir).parts
+    source, folder = parts[0], parts[1]
+    stem = os.path.splitext(parts[-1])[0].replace("%20", "")
+    entry = {"source": source, "folder": folder, "kind": None,
+             "airline": None, "year": None, "month": None, "quarter": None}
+
+    if folder == 'domestic' and "CITYPAIR" in parts[-1]:
+        date = map_string_to_date(stem)
+        if date:
+            entry["kind"] = 'city'
+            entry["year"] = "20{}".format(date.split("/")[0])
+            entry["month"] = date.split("/")[1]
+    elif folder == 'domestic':
+        # Carrier workbooks are named <airline><yy>
+        if stem[-2:].isdigit():
+            airline = re.sub(r'\d+', '', stem)
+            entry["kind"] = 'carrier'
+            entry["airline"] = airline_mapping.get(airline, airline)
+            entry["year"] = int("20{}".format(stem[-2:]))
+    elif folder == 'international':
+        # Quarterly workbooks are named <yy>Q<quarter>_<table>
+        match = re.search(r'_(\d+)$', stem)
+        if match and match.group(1) in INTERNATIONAL_TABLES:
+            entry["kind"] = 'international_{}'.format(match.group(1))
+            entry["year"] = stem[0:2]
+            entry["quarter"] = stem[3]
+
+    return entry
+
+
+def load_index(path=INDEX_FILE) -> dict | None:
+    try:
+        with open(path, "r") as f:
+            return json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return None
+
+
+def save_index(index: dict, path=INDEX_FILE):
+    Path(path).parent.mkdir(parents=True, exist_ok=True)
+    atomic_write(Path(path), json.dumps(index, indent=2, sort_keys=True).encode())
+
+
+def build_index(raw_dir=RAW_DIR, previous: dict | None = None, checksums: dict | None = None) -> dict:
+    """Walk raw_dir once and describe every raw file, keyed by its path.
+
+    Files whose size and mtime match their `previous` entry keep it as is, so
+    only new or changed files are hashed. `checksums` maps paths to SHA-256
+    digests already known, such as those in the fetch manifest.
+    """
+    previous = previous or {}
+    checksums = checksums or {}
+    index = {}
+    for source, extensions in RAW_EXTENSIONS.items():
+        for root, _, files in os.walk(os.path.join(raw_dir, source)):
+            for name in files:
+                if not name.lower().endswith(extensions):
+                    continue
+                path = Path(root, name).as_posix()
+                stat = os.stat(path)
+                entry = previous.get(path)
+                if entry and entry["size"] == stat.st_size and entry["mtime"] == stat.st_mtime:
+                    index[path] = entry
+                    continue
+                entry = describe(path, raw_dir)
+                entry["size"] = stat.st_size
+                entry["mtime"] = stat.st_mtime
+                entry["sha256"] = checksums.get(path) or file_checksum(path)
+                index[path] = entry
+    return index
+
+
+def update_index(raw_dir=RAW_DIR, path=INDEX_FILE, checksums: dict | None = None, rehash=False) -> dict:
+    """Rebuild the index incrementally from the one on disk, and save it.
+
+    With `rehash`, the index on disk is ignored and every file is hashed again.
+    """
+    index = build_index(raw_dir, None if rehash else load_index(path), checksums)
+    save_index(index, path)
+    return index
+
+
+def query(index: dict, source: str, *kinds: str) -> list:
+    """(path, entry) pairs of the given source and table kinds, sorted by path."""
+    return [(path, index[path]) for path in sorted(index)
+            if index[path]["source"] == source and index[path]["kind"] in kinds]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Index the raw DGCA files, recording their table, period and checksum")
+    parser.add_argument("--raw-dir", default=RAW_DIR, help="Directory with the raw xlsx and csv folders")
+    parser.add_argument("--index", default=INDEX_FILE, help="Index file to update")
+    args = parser.parse_args()
+
+    index = update_index(args.raw_dir, args.index)
+    print(f"Indexed {len(index)} raw files")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,16 +1,24 @@
 #!/usr/bin/env python3
 
+import argparse
 import os
 import re
 import time
 import json
 import requests
 import shutil
+import sys
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, as_completed, wait
 from pathlib import Path
 from html.parser import HTMLParser
 
+from cache import ResponseCache, ExistenceCache, DEFAULT_TTL, DEFAULT_MAX_BYTES, DEFAULT_NEGATIVE_TTL, atomic_write
+from fetch import TIMEOUT, make_session
+
 # Constants
-BASE_URL = "https://www.dgca.gov.in/digigov-portal/scan?"
+BASE_URL = os.environ.get("DGCA_BASE_URL", "https://www.dgca.gov.in/digigov-portal/scan?")
 PARENT_CONTENT_ID = "4184"
 RULE_BOOK_ID = "259"
 REQUEST_DATA = {
@@ -25,17 +33,44 @@ REQUEST_DATA = {
     "attr": ""
 }
 
+# Crawler defaults: requests are spread over a pool of workers, but never sent
+# faster than the rate limit (one request every 3 seconds, as before)
+DEFAULT_WORKERS = 4
+DEFAULT_RATE = 1 / 3
+CACHE_DIR = "cache/responses"
+CHECKPOINT_FILE = "urls/checkpoint.json"
+
+# International tables are generated rather than crawled, and probed for existence
+INTERNATIONAL_URL = "https://public-prd-dgca.s3.ap-south-1.amazonaws.com/InventoryList/dataReports/aviationDataStatistics/airTransport/international/quaterly/{year}Q{quarter}_{table}.xlsx"
+FIRST_INTERNATIONAL_YEAR = 15
+MISSING_QUARTERS_LIMIT = 4
+DEFAULT_PROBE_WORKERS = 8
+EXISTENCE_CACHE_FILE = "cache/objects.json"
+
 # Patterns
 JSP_URL_PATTERN = r"jsp[a-zA-Z0-9/ _%,]*\.[a-z]+"
 YEARLY_PATTERN = r"yearly[^\"']*html"
 CITY_PAIR_PATTERN = r'city.*?pair|CITYPAIR'
 
 
-def make_request(content_id: str, service_name: str) -> str:
-    """Make a POST request to DGCA API and return response text."""
+def make_request(content_id: str, service_name: str, limiter=None, cache: ResponseCache = None) -> str:
+    """Make a POST request to DGCA API and return response text, answering from the cache when fresh."""
+    entry = cache.get(content_id, service_name) if cache is not None else None
+    if entry is not None and cache.is_fresh(entry):
+        return entry["body"]
+
+    if limiter is not None:
+        limiter.acquire()
     data = {**REQUEST_DATA, "contentId": content_id, "serviceName": service_name}
-    response = requests.post(BASE_URL, data=data)
+    headers = cache.validators(entry) if cache is not None else {}
+    response = requests.post(BASE_URL, data=data, headers=headers, timeout=TIMEOUT)
+    if response.status_code == 304 and entry is not None:
+        cache.touch(content_id, service_name, entry)
+        return entry["body"]
     response.raise_for_status()
+
+    if cache is not None and not cache.put(content_id, service_name, response.text, response.headers):
+        print(f"    contentId {content_id} unchanged since last fetch")
     return response.text
 
 
@@ -213,84 +248,192 @@ def get_domestic_city_pair_content_id(year_content: str) -> str | None:
     return None
 
 
-def recursively_extract_urls(content_id: str, visited: set = None, depth: int = 0, max_depth: int = 10) -> set:
-    """Recursively extract URLs from content, following HTML links."""
-    if visited is None:
-        visited = set()
-    
-    # Prevent infinite recursion
-    if content_id in visited or depth > max_depth:
-        return set()
-    
-    visited.add(content_id)
-    all_urls = set()
-    
-    # Fetch content for this content ID
+class TokenBucket:
+    """Thread-safe token bucket allowing `rate` requests per second with bursts up to `capacity`."""
+    def __init__(self, rate: float, capacity: int = 1):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        """Block until a token is available, then consume it."""
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+def fetch_content(content_id: str, limiter: TokenBucket, cache: ResponseCache = None) -> tuple:
+    """Fetch one content ID and return the XLS/XLSX URLs and HTML content IDs it links to."""
+    content = make_request(content_id, "fetchRulebookContentDtlsList", limiter, cache)
+    return extract_urls(content), extract_html_content_ids(content)
+
+
+def new_crawl_state(content_ids) -> dict:
+    """Initial crawl state: every seed content ID queued at depth 0."""
+    content_ids = sorted(set(content_ids))
+    return {"frontier": [[content_id, 0] for content_id in content_ids], "visited": content_ids, "urls": []}
+
+
+def load_checkpoint(path: Path) -> dict | None:
+    """Load a crawl state saved by save_checkpoint, if there is one."""
     try:
-        content = make_request(content_id, "fetchRulebookContentDtlsList")
-        time.sleep(3)  # Rate limiting
-        
-        # Extract XLS/XLSX URLs from current content
-        urls = extract_urls(content)
-        all_urls.update(urls)
-        if urls:
-            print(f"    {'  ' * depth}Found {len(urls)} XLS/XLSX URLs")
-        
-        # Extract HTML content IDs from current content
-        html_content_ids = extract_html_content_ids(content)
-        
-        # Recursively process each HTML content ID
-        for html_content_id in html_content_ids:
-            if html_content_id not in visited:
-                print(f"    {'  ' * depth}Following HTML link (contentId: {html_content_id})...")
-                nested_urls = recursively_extract_urls(html_content_id, visited, depth + 1, max_depth)
-                all_urls.update(nested_urls)
-    
-    except Exception as e:
-        print(f"    {'  ' * depth}Error processing contentId {content_id}: {e}")
-    
+        with open(path, "r") as f:
+            return json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return None
+
+
+def save_checkpoint(path: Path, frontier, visited: set, urls: set):
+    """Atomically save the crawl frontier, visited content IDs and URLs found so far."""
+    state = {"frontier": [list(item) for item in frontier], "visited": sorted(visited), "urls": sorted(urls)}
+    atomic_write(path, json.dumps(state).encode())
+
+
+class CrawlIncomplete(Exception):
+    """Raised when some pages could not be fetched; they are still queued in the checkpoint."""
+
+
+def crawl_urls(state: dict, limiter: TokenBucket, workers: int = 4, cache: ResponseCache = None, checkpoint: Path = None, max_depth: int = 10) -> set:
+    """Crawl content IDs with a bounded pool of workers, following HTML links breadth-first.
+
+    Pages that fail are not retried in this run, but stay queued in the checkpoint,
+    and CrawlIncomplete is raised once everything else has been crawled.
+    """
+    visited = set(state["visited"])
+    all_urls = set(state["urls"])
+    frontier = deque((content_id, depth) for content_id, depth in state["frontier"])
+    failed = []
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        pending = {}
+        while frontier or pending:
+            # Keep the pool full; the limiter decides how fast requests actually go out
+            while frontier and len(pending) < workers:
+                content_id, depth = frontier.popleft()
+                pending[executor.submit(fetch_content, content_id, limiter, cache)] = (content_id, depth)
+
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                content_id, depth = pending.pop(future)
+                try:
+                    urls, html_content_ids = future.result()
+                except Exception as e:
+                    print(f"    Error processing contentId {content_id}: {e}")
+                    failed.append((content_id, depth))
+                    urls, html_content_ids = set(), set()
+                else:
+                    all_urls.update(urls)
+                    print(f"    contentId {content_id}: found {len(urls)} XLS/XLSX URLs (total so far: {len(all_urls)})")
+
+                if depth < max_depth:
+                    for html_content_id in sorted(html_content_ids):
+                        if html_content_id not in visited:
+                            visited.add(html_content_id)
+                            frontier.append((html_content_id, depth + 1))
+
+                # In-flight and failed pages are saved as still queued, so the next run re-requests only those
+                if checkpoint is not None:
+                    save_checkpoint(checkpoint, list(pending.values()) + list(frontier) + failed, visited, all_urls)
+
+    if failed:
+        raise CrawlIncomplete(f"{len(failed)} pages could not be fetched: contentId {', '.join(content_id for content_id, _ in failed)}")
     return all_urls
 
 
-def process_domestic_data():
-    """Process domestic data: get years, then XLS files and recursively extract from HTMLs."""
-    print("Fetching parent data (contentId: 4184)...")
-    parent_content = make_request(PARENT_CONTENT_ID, "getParentData")
-    print(f"Parent data fetched, response length: {len(parent_content)}")
-    
-    # Extract year content IDs from parent
-    print("Extracting year content IDs...")
-    year_content_ids = extract_content_ids(parent_content, r"monthlyStatistics.*?html")
-    print(f"Found {len(year_content_ids)} year content IDs")
-    
-    # Fetch year data and recursively extract URLs
-    print(f"Fetching {len(year_content_ids)} year data files...")
-    all_domestic_urls = set()
-    visited = set()
-    
-    for content_id in sorted(year_content_ids):
-        time.sleep(3)  # Rate limiting
-        print(f"  Fetching year {content_id}...")
-        
-        # Recursively extract URLs from this year's content
-        year_urls = recursively_extract_urls(content_id, visited)
-        all_domestic_urls.update(year_urls)
-        print(f"  Year {content_id}: Found {len(year_urls)} URLs (total so far: {len(all_domestic_urls)})")
+def process_domestic_data(limiter: TokenBucket, workers: int, cache: ResponseCache = None, checkpoint: Path = None):
+    """Process domestic data: get years, then crawl XLS files and linked HTML pages."""
+    state = load_checkpoint(checkpoint) if checkpoint is not None else None
+    if state is not None:
+        print(f"Resuming crawl from {checkpoint}: {len(state['frontier'])} queued, {len(state['visited'])} visited, {len(state['urls'])} URLs found")
+    else:
+        print("Fetching parent data (contentId: 4184)...")
+        parent_content = make_request(PARENT_CONTENT_ID, "getParentData", limiter, cache)
+        print(f"Parent data fetched, response length: {len(parent_content)}")
+
+        # Extract year content IDs from parent
+        print("Extracting year content IDs...")
+        year_content_ids = extract_content_ids(parent_content, r"monthlyStatistics.*?html")
+        print(f"Found {len(year_content_ids)} year content IDs")
+        state = new_crawl_state(year_content_ids)
+
+    # Crawl all years through one shared frontier and visited set
+    print(f"Crawling with {workers} workers...")
+    all_domestic_urls = crawl_urls(state, limiter, workers, cache, checkpoint)
     
     print(f"Found {len(all_domestic_urls)} total domestic URLs")
     
     return sorted(all_domestic_urls)
 
 
-def process_international_data():
-    """Generate international URLs (retain existing flow)."""
-    print("Generating international URLs...")
+def probe_url(session, url: str) -> bool:
+    """Check whether an S3 object exists with a HEAD request."""
+    response = session.head(url, timeout=30)
+    if response.status_code in (403, 404):
+        # S3 answers 403 rather than 404 for missing keys in buckets that cannot be listed
+        return False
+    response.raise_for_status()
+    return True
+
+
+def probe_urls(urls: list, existence: ExistenceCache, session, workers: int) -> dict:
+    """Return url -> True/False/None (unknown), probing concurrently whatever the cache does not know."""
+    results = {url: existence.get(url) for url in urls}
+    to_probe = [url for url, exists in results.items() if exists is None]
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = {executor.submit(probe_url, session, url): url for url in to_probe}
+        for future in as_completed(futures):
+            url = futures[future]
+            try:
+                results[url] = future.result()
+                existence.put(url, results[url])
+            except Exception as e:
+                print(f"  Could not probe {url}: {e}")
+    return results
+
+
+def process_international_data(existence: ExistenceCache, workers: int = DEFAULT_PROBE_WORKERS):
+    """Generate international URLs, keeping only objects that exist.
+
+    Years are probed from FIRST_INTERNATIONAL_YEAR onwards until
+    MISSING_QUARTERS_LIMIT consecutive quarters have no tables at all.
+    """
+    print("Probing international URLs...")
+    session = make_session(workers)
     international_urls = []
-    for table in range(1, 5):  # 1 to 4
-        for year in range(15, 26):  # 15 to 25
-            for quarter in range(1, 5):  # 1 to 4
-                url = f"https://public-prd-dgca.s3.ap-south-1.amazonaws.com/InventoryList/dataReports/aviationDataStatistics/airTransport/international/quaterly/{year}Q{quarter}_{table}.xlsx"
-                international_urls.append(url)
+    missing_quarters = 0
+    year = FIRST_INTERNATIONAL_YEAR
+    while missing_quarters < MISSING_QUARTERS_LIMIT:
+        urls = {
+            (quarter, table): INTERNATIONAL_URL.format(year=year, quarter=quarter, table=table)
+            for quarter in range(1, 5)  # 1 to 4
+            for table in range(1, 5)  # 1 to 4
+        }
+        results = probe_urls(list(urls.values()), existence, session, workers)
+
+        for quarter in range(1, 5):
+            quarter_results = [results[urls[(quarter, table)]] for table in range(1, 5)]
+            # Unknown objects are still fetched, but do not extend the year range
+            international_urls.extend(urls[(quarter, table)] for table in range(1, 5) if quarter_results[table - 1] is not False)
+            if any(quarter_results):
+                missing_quarters = 0
+            else:
+                missing_quarters += 1
+                if missing_quarters >= MISSING_QUARTERS_LIMIT:
+                    break
+        year += 1
+
+    existence.save()
+    print(f"Found {len(international_urls)} international URLs up to {year - 1}")
     return international_urls
 
 
@@ -300,14 +443,18 @@ def save_urls(urls: list, filename: str):
         f.write("\n".join(urls) + "\n")
 
 
-def main():
+def main(workers: int = DEFAULT_WORKERS, rate: float = DEFAULT_RATE, cache: ResponseCache = None, existence: ExistenceCache = None):
     """Main execution function."""
-    # Process domestic data
-    domestic_urls = process_domestic_data()
+    limiter = TokenBucket(rate)
+    if existence is None:
+        existence = ExistenceCache(EXISTENCE_CACHE_FILE)
+
+    # Process domestic data, resuming from the checkpoint of a failed run if present
+    domestic_urls = process_domestic_data(limiter, workers, cache, Path(CHECKPOINT_FILE))
     save_urls(domestic_urls, "urls/domestic.txt")
     
     # Process international data
-    international_urls = process_international_data()
+    international_urls = process_international_data(existence)
     save_urls(international_urls, "urls/international.txt")
     
     # Merge all URLs
@@ -319,16 +466,32 @@ def main():
 
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Initialize the list of DGCA XLSX URLs to be fetched")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS, help="Number of concurrent crawler requests")
+    parser.add_argument("--rate", type=float, default=DEFAULT_RATE, help="Maximum requests per second sent to DGCA")
+    parser.add_argument("--cache-dir", default=CACHE_DIR, help="Directory for cached API responses")
+    parser.add_argument("--cache-ttl", type=float, default=DEFAULT_TTL / 3600, help="Hours before a cached response is revalidated")
+    parser.add_argument("--cache-size", type=float, default=DEFAULT_MAX_BYTES / 2**20, help="Maximum cache size in MB")
+    parser.add_argument("--negative-ttl", type=float, default=DEFAULT_NEGATIVE_TTL / 3600, help="Hours before a missing international table is probed again")
+    parser.add_argument("--refresh", action="store_true", help="Ignore cached responses and probes, and fetch everything again")
+    args = parser.parse_args()
+
+    cache = ResponseCache(args.cache_dir, ttl=args.cache_ttl * 3600, max_bytes=int(args.cache_size * 2**20), refresh=args.refresh)
+    existence = ExistenceCache(EXISTENCE_CACHE_FILE, negative_ttl=args.negative_ttl * 3600, refresh=args.refresh)
+
     # Create urls directory
     urls_dir = Path("urls")
     urls_dir.mkdir(exist_ok=True)
     
+    # Temporary files are kept on failure, so the next run resumes from the checkpoint
     try:
-        main()
-    finally:
-        # Cleanup temporary files
-        print("Cleaning up temporary files...")
-        if Path("list.json").exists():
-            os.remove("list.json")
-        if urls_dir.exists():
-            shutil.rmtree(urls_dir)
+        main(args.workers, args.rate, cache, existence)
+    except CrawlIncomplete as e:
+        sys.exit(f"Crawl incomplete, {e}. Run again to retry them from {CHECKPOINT_FILE}")
+
+    # Cleanup temporary files
+    print("Cleaning up temporary files...")
+    if Path("list.json").exists():
+        os.remove("list.json")
+    if urls_dir.exists():
+        shutil.rmtree(urls_dir)
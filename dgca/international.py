@@ -4,30 +4,34 @@ import os
 import pandas as pd
 import re
 
+from cleaning import *
+from index import INTERNATIONAL_TABLES, query
+from pipeline import instrument
 from utils import *
 
-def international_table(table):
-    directory_path = './raw/csv/international'
+def international_tables(index, source='xlsx', cache=None, jobs=None):
+    kinds = ['international_{}'.format(table) for table in INTERNATIONAL_TABLES]
+    raw_files = query(index, source, *kinds)
 
-    # Get list of CSV files
-    pattern = '{}/**/*_{}.csv'.format(directory_path, table)
-    csv_files = glob.glob(pattern, recursive=True)
+    # Read every file exactly once, then route each frame to its table
+    with instrument.step('load'):
+        instrument.count('files', len(raw_files))
+        dataframes = load_dataframes(raw_files, cache=cache, jobs=jobs)
+    routed = {kind: [] for kind in kinds}
+    for (_, entry), df in zip(raw_files, dataframes):
+        routed[entry['kind']].append(df)
 
-    # Read CSV files into a single dataframe
-    dataframes = []
-    for csv_file in csv_files:
-        df = csv_to_dataframe(csv_file, domestic=False, table='')
-        if df is not None:
-            dataframes.append(df)
+    output_files = []
+    for table, kind in zip(INTERNATIONAL_TABLES, kinds):
+        with instrument.step('table {}'.format(table)):
+            output_files.append(international_table(table, routed[kind]))
+    return output_files
 
+def international_table(table, dataframes):
     # Cleanup columns
     combined_df = pd.concat(dataframes)
-    if table == '4':
-        combined_df = combined_df.iloc[:, :9]
-    combined_df = combined_df[~combined_df.map(lambda x: isinstance(x, str) and "NAME OF THE AIRLINE" in x)]
-    combined_df = combined_df[~combined_df.map(lambda x: isinstance(x, str) and "FROM INDIA" in x)]
-    combined_df = combined_df[~combined_df.map(lambda x: isinstance(x, str) and "FROM CITY" in x)]
-    combined_df = combined_df.dropna()
+    instrument.count('rows_in', len(combined_df))
+    combined_df = clean_table(combined_df, 'international_{}'.format(table))
     combined_df.drop(columns=combined_df.columns[0], axis=1, inplace=True)
 
     # Assign columns based on table type
@@ -48,10 +52,7 @@ def international_table(table):
         combined_df.sort_values(by=['City1', 'City2', 'Year', 'Quarter'], inplace=True)
         filename = 'city'
 
-    # Truncate floats to 2 decimal points for 'Freight' columns
-    cols_to_convert = combined_df.columns[combined_df.columns.str.contains('Freight')]
-    for col in cols_to_convert:
-        combined_df[col] = pd.to_numeric(combined_df[col], errors='coerce')
+    # Truncate floats to 2 decimal points for 'Freight' columns, typed on read by the schema
     float_format = '{:.2f}'.format
 
     columns = list(combined_df.columns)
@@ -64,4 +65,8 @@ def international_table(table):
 
     combined_df = combined_df.reindex(columns=columns)
 
-    combined_df.to_csv('../aggregated/international/{}.csv'.format(filename), index=False, float_format=float_format)
+    instrument.count('rows_out', len(combined_df))
+    output_file = '../aggregated/international/{}.csv'.format(filename)
+    combined_df.to_csv(output_file, index=False, float_format=float_format)
+
+    return output_file
@@ -20,3 +20,6 @@ find "raw/xlsx" \( -iname "*.xls" -o -iname "*.xlsx" \) -print0 | while IFS= rea
   ssconvert "$file" "${output_file}"
 
 done
+
+# Add the CSVs to the raw file index
+python3 index.py
@@ -0,0 +1,98 @@
+import csv
+import filecmp
+import os
+import shutil
+import tempfile
+
+import pandas as pd
+
+from columnar import normalise_year
+
+# Partitioned tables are folders next to where their CSV would be, with one <column>=<value> folder per year
+PARTITION_COLUMN = 'Year'
+PARTITION_FILE = 'part.csv'
+
+
+def partition_value(year):
+    return normalise_year(int(float(year)))
+
+
+def partition_path(table_dir, year):
+    return os.path.join(table_dir, '{}={}'.format(PARTITION_COLUMN.lower(), year), PARTITION_FILE)
+
+
+def write_partitions(csv_file, table_dir=None):
+    """Split an aggregated CSV into one file per year, and return the partitions that changed.
+
+    Rows keep their order in the CSV. A partition is only replaced if its contents
+    differ, so adding a month rewrites that year alone, and partitions of years no
+    longer in the CSV are removed.
+    """
+    table_dir = table_dir or os.path.splitext(csv_file)[0]
+    os.makedirs(table_dir, exist_ok=True)
+
+    with tempfile.TemporaryDirectory(dir=table_dir, prefix='.partitions-') as tmp_dir:
+        handles = {}
+        writers = {}
+        try:
+            with open(csv_file, 'r', newline='') as f:
+                reader = csv.reader(f)
+                header = next(reader)
+                column = header.index(PARTITION_COLUMN)
+                for row in reader:
+                    year = partition_value(row[column])
+                    if year not in writers:
+                        handles[year] = open(os.path.join(tmp_dir, str(year)), 'w', newline='')
+                        writers[year] = csv.writer(handles[year], lineterminator='\n')
+                        writers[year].writerow(header)
+                    writers[year].writerow(row)
+        finally:
+            for handle in handles.values():
+                handle.close()
+
+        changed = []
+        for year in sorted(writers):
+            destination = partition_path(table_dir, year)
+            source = os.path.join(tmp_dir, str(year))
+            if os.path.exists(destination) and filecmp.cmp(source, destination, shallow=False):
+                continue
+            os.makedirs(os.path.dirname(destination), exist_ok=True)
+            os.replace(source, destination)
+            changed.append(destination)
+
+    prefix = '{}='.format(PARTITION_COLUMN.lower())
+    for name in os.listdir(table_dir):
+        if name.startswith(prefix) and int(name[len(prefix):]) not in writers:
+            shutil.rmtree(os.path.join(table_dir, name))
+
+    return changed
+
+
+def table_files(table):
+    """CSV files of an aggregated table: its partitions in year order, or the single CSV."""
+    table = os.path.splitext(table)[0]
+    if not os.path.isdir(table):
+        return [table + '.csv'] if os.path.exists(table + '.csv') else []
+    prefix = '{}='.format(PARTITION_COLUMN.lower())
+    years = sorted(int(name[len(prefix):]) for name in os.listdir(table) if name.startswith(prefix))
+    return [partition_path(table, year) for year in years]
+
+
+def read_table(table, years=None):
+    """Read an aggregated table, either a partitioned folder or a single CSV, optionally only some years.
+
+    With a partitioned folder, only the partitions of the requested years are opened.
+    """
+    table = os.path.splitext(table)[0]
+    if os.path.isdir(table):
+        if years is None:
+            paths = table_files(table)
+        else:
+            paths = [path for path in (partition_path(table, year) for year in years) if os.path.exists(path)]
+        dataframes = [pd.read_csv(path) for path in paths]
+        return pd.concat(dataframes, ignore_index=True) if dataframes else pd.DataFrame()
+
+    df = pd.read_csv(table + '.csv')
+    if years is not None:
+        df = df[df[PARTITION_COLUMN].map(partition_value).isin(list(years))].reset_index(drop=True)
+    return df
@@ -0,0 +1,78 @@
+import importlib.util
+
+import numpy as np
+import pandas as pd
+
+# The pyarrow engine parses CSVs on multiple threads; it is optional, and the C engine is used without it
+CSV_ENGINE = 'pyarrow' if importlib.util.find_spec('pyarrow') else 'c'
+
+# Typed columns of each table kind in the raw index, by column label after append_columns:
+#   numeric: columns holding measures, parsed as numbers, with any other text becoming NaN
+#   null_markers: cell values standing in for a number in the numeric columns
+#   drop_blank: drop rows with a blank numeric cell before typing, which would otherwise read
+#               as missing just like any other text ('-' rows are kept, as untyped tables kept them)
+SCHEMAS = {
+    'city': {
+        'numeric': [3, 4, 5, 6, 7, 8],
+        'null_markers': {'-': 0},
+    },
+    'carrier': {
+        'numeric': list(range(1, 17)),
+        'null_markers': {'-': 0},
+    },
+    'international_1': {
+        'numeric': [4, 5],
+        'drop_blank': True,
+    },
+    'international_2': {
+        'numeric': [4, 5, 8, 9, 12, 13],
+        'drop_blank': True,
+    },
+    'international_3': {
+        'numeric': [4, 5],
+        'drop_blank': True,
+    },
+    'international_4': {
+        'numeric': [5, 6],
+        'drop_blank': True,
+    },
+}
+
+
+def read_csv(csv_file):
+    try:
+        return pd.read_csv(csv_file, header=None, engine=CSV_ENGINE)
+    except Exception:
+        # pyarrow rejects some files the C engine accepts, like rows with more fields than the first
+        if CSV_ENGINE == 'c':
+            raise
+        return pd.read_csv(csv_file, header=None)
+
+
+def apply_schema(df, kind):
+    schema = SCHEMAS.get(kind)
+    if schema is None:
+        return df
+
+    if schema.get('drop_blank'):
+        df = df.dropna(subset=[col for col in schema['numeric'] if col in df.columns]).copy()
+
+    for col in schema['numeric']:
+        if col not in df.columns:
+            continue
+        values = df[col]
+        for marker, value in schema.get('null_markers', {}).items():
+            values = values.mask(values.eq(marker), value)
+        df[col] = pd.to_numeric(values, errors='coerce')
+
+    return df
+
+
+def restore_integers(df, columns):
+    # Typing each raw file reads its title and header rows as NaN, so measures come out as floats;
+    # once those rows are filtered out, columns of whole numbers are written as integers again
+    for col in columns:
+        values = df[col]
+        if values.dtype.kind == 'f' and np.isfinite(values).all() and values.eq(values.round()).all():
+            df[col] = values.astype('int64')
+    return df
@@ -1,11 +1,15 @@
-import glob
 import numpy as np
-import os
 import pandas as pd
 import re
 
+from concurrent.futures import ProcessPoolExecutor
 from dateutil.parser import parse
 
+from schema import apply_schema, read_csv
+
+# Bump whenever parsing changes the frames append_columns produces, to invalidate cached frames
+PARSER_VERSION = 5
+
 month_mapping = {
     "JAN": "01", "FEB": "02", "MAR": "03", "APR": "04",
     "MAY": "05", "JUN": "06", "JUL": "07", "AUG": "08",
@@ -87,12 +91,40 @@ def map_string_to_date(string):
 
         return parsed_date.strftime("%y/%m")
 
-def append_columns(df, filename, domestic, table):
+# Carrier workbooks are split into sections by header rows; checked in order, first match wins
+section_types = {
+    r'NON.*SCH.*INTER': "NonScheduledInternational",
+    r'SCH.*INTER': "ScheduledInternational",
+    r'NON.*SCH.*DOM': "NonScheduledDomestic",
+    r'SCH.*DOM': "ScheduledDomestic"
+}
+section_patterns = [re.compile(pattern, re.IGNORECASE) for pattern in section_types]
+section_header_pattern = re.compile('|'.join(section_types), re.IGNORECASE)
+
+def assign_section_types(df):
+    # Find section header rows with one pass over the flattened frame
+    cells = pd.Series(df.astype(str).to_numpy().ravel())
+    is_header = cells.str.contains(section_header_pattern).to_numpy().reshape(df.shape).any(axis=1)
+    if not is_header.any():
+        return df
+
+    # Map each header row to its Type from its own cells, and carry it down to the next header
+    types = pd.Series(np.nan, index=df.index, dtype=object)
+    for position in np.flatnonzero(is_header):
+        row = [str(cell) for cell in df.iloc[position]]
+        for pattern, value in zip(section_patterns, section_types.values()):
+            if any(pattern.search(cell) for cell in row):
+                types.iloc[position] = value
+                break
+    df['Type'] = types.ffill()
+
+    return df
 
-    if domestic and table == 'city':
-        date = map_string_to_date(filename)
-        year = "20{}".format(date.split("/")[0])
-        month = date.split("/")[1]
+def append_columns(df, entry):
+    # Year, month, quarter and airline come from the raw file index, which parsed them from the filename
+    if entry['kind'] == 'city':
+        year = entry['year']
+        month = entry['month']
 
         # Edge case for August 2015
         if year == '2015' and month == '08':
@@ -103,50 +135,68 @@ def append_columns(df, filename, domestic, table):
         df['Year'] = year
         df['Month'] = month
     
-    if domestic and table == 'carrier':
-        year = filename[-2:] 
-        df['Year'] = int("20{}".format(year))
-        df['Airline'] = filename
+    if entry['kind'] == 'carrier':
+        df['Year'] = entry['year']
+        df['Airline'] = entry['airline']
         
-        masks = []
-        patterns = [
-            'NON.*SCH.*INTER',
-            'SCH.*INTER',
-            'NON.*SCH.*DOM',
-            'SCH.*DOM'
-        ]
-        for col in df.columns:
-            masks.append(df[col].astype(str).str.contains('|'.join(patterns), na=False, case=False, regex=True))
-        matching_indices = df.index[pd.concat(masks, axis=1).any(axis=1)].tolist()
-        matching_indices.append(len(df))
-
-        pattern_mapping = {
-            r'NON.*SCH.*INTER': "NonScheduledInternational",
-            r'SCH.*INTER': "ScheduledInternational",
-            r'NON.*SCH.*DOM': "NonScheduledDomestic",
-            r'SCH.*DOM': "ScheduledDomestic"
-        }
-        for index in range(0, len(matching_indices) - 1):
-            row = df.loc[matching_indices[index]]
-            for pattern, value in pattern_mapping.items():
-                if any(re.search(pattern, str(cell), re.IGNORECASE) for cell in row):
-                    df.loc[matching_indices[index]:matching_indices[index + 1], 'Type'] = value
-                    break
-
-    if not domestic:
-        year = filename[0:2]
-        quarter = filename[3]
-        df['Year'] = year
-        df['Quarter'] = quarter
+        df = assign_section_types(df)
+
+    if entry['folder'] == 'international':
+        df['Year'] = entry['year']
+        df['Quarter'] = entry['quarter']
+
+    return df
+
+def excel_to_dataframe(excel_file, entry):
+    # Only the first sheet, as ssconvert does when converting to CSV
+    df = pd.read_excel(excel_file, header=None, sheet_name=0)
+
+    df = append_columns(df, entry)
+    df = apply_schema(df, entry['kind'])
 
     return df
 
-def csv_to_dataframe(csv_file, domestic, table):
+def raw_to_dataframe(raw_file, entry):
+    if raw_file.lower().endswith('.csv'):
+        return csv_to_dataframe(raw_file, entry)
+    return excel_to_dataframe(raw_file, entry)
+
+def parse_raw_files(raw_files, jobs=None):
+    # raw_files are (path, index entry) pairs; with more than one job, workbooks are parsed
+    # in separate processes, and results keep the input order
+    paths = [path for path, _ in raw_files]
+    entries = [entry for _, entry in raw_files]
+    if jobs == 1:
+        return [raw_to_dataframe(path, entry) for path, entry in raw_files]
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        return list(executor.map(raw_to_dataframe, paths, entries))
+
+def load_dataframes(raw_files, cache=None, jobs=None):
+    dataframes = [None] * len(raw_files)
+
+    # Frames of unchanged files come straight from the cache, keyed by the checksums in the index
+    if cache is not None:
+        for index, (path, entry) in enumerate(raw_files):
+            dataframes[index] = cache.get(path, entry['kind'], entry['sha256'])
+    misses = [index for index, df in enumerate(dataframes) if df is None]
+
+    if misses:
+        parsed = parse_raw_files([raw_files[index] for index in misses], jobs)
+        for index, df in zip(misses, parsed):
+            dataframes[index] = df
+            if cache is not None and df is not None:
+                path, entry = raw_files[index]
+                cache.put(path, entry['kind'], entry['sha256'], df)
+
+    # Aligned with raw_files; pd.concat skips the None entries of files that failed to parse
+    return dataframes
+
+def csv_to_dataframe(csv_file, entry):
     #try:
-    df = pd.read_csv(csv_file, header=None)
-    filename = csv_file.split("/")[-1].replace(".csv", "").replace("%20", "")
+    df = read_csv(csv_file)
 
-    df = append_columns(df, filename, domestic, table)
+    df = append_columns(df, entry)
+    df = apply_schema(df, entry['kind'])
 
     return df
 
@@ -1,10 +1,51 @@
+import argparse
+import datetime
 import os
+import re
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
 from glob import glob
+from html import unescape
+from itertools import repeat
 from bs4 import BeautifulSoup
+from bs4.builder import HTMLTreeBuilder
 import pandas as pd
 
 from dateutil import parser
 
+# pipeline/ is a package at the repository root, one folder up from this script
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from pipeline import instrument, profiling
+
+# Comments, scripts and styles, which hold none of the figures but much of a snapshot's size
+IGNORED_MARKUP = re.compile(r'<!--.*?-->|<(script|style)\b[^>]*>.*?</\1\s*>', re.S | re.I)
+# Tags, and declarations (which only split the text around them)
+MARKUP = re.compile(r'<(/?)([a-zA-Z][^\s/>]*)((?:[^>"\']|"[^"]*"|\'[^\']*\')*)>|<[!?][^>]*>')
+ATTRIBUTE = re.compile(r'([^\s=/>]+)(?:\s*=\s*("[^"]*"|\'[^\']*\'|[^\s>]+))?')
+
+MONTHS = {
+    'jan': 1, 'feb': 2, 'mar': 3, 'apr': 4, 'may': 5, 'jun': 6,
+    'jul': 7, 'aug': 8, 'sep': 9, 'sept': 9, 'oct': 10, 'nov': 11, 'dec': 12,
+    'january': 1, 'february': 2, 'march': 3, 'april': 4, 'june': 6,
+    'july': 7, 'august': 8, 'september': 9, 'october': 10, 'november': 11, 'december': 12,
+}
+DAY_MONTH_YEAR = re.compile(r'\b(\d{1,2})(?:st|nd|rd|th)?[\s./-]*([A-Za-z]{3,9})[\s.,/-]*(\d{4})\b')
+MONTH_DAY_YEAR = re.compile(r'\b([A-Za-z]{3,9})[\s.]*(\d{1,2})(?:st|nd|rd|th)?,?\s*(\d{4})\b')
+
+@lru_cache(maxsize=None)
+def parse_date(text):
+    # The dashboards write dates as "17 September 2023", "17 Sep 2023" or "Sep 17, 2023";
+    # anything else goes through dateutil's much slower fuzzy parse
+    for pattern, day_group, month_group in ((DAY_MONTH_YEAR, 1, 2), (MONTH_DAY_YEAR, 2, 1)):
+        match = pattern.search(text)
+        if match and match.group(month_group).lower() in MONTHS:
+            try:
+                return datetime.date(int(match.group(3)), MONTHS[match.group(month_group).lower()], int(match.group(day_group)))
+            except ValueError:
+                pass
+    return parser.parse(text, fuzzy=True).date()
+
 def parse_html_type1(soup, html_file):
 
     daily_data = {}
@@ -17,7 +58,7 @@ def parse_html_type1(soup, html_file):
         col = airport_cols[0].find_all('h2')[0]
         span = col.find_all('span')[-1]
         text = span.text
-        date = parser.parse(text, fuzzy=True).date()
+        date = parse_date(text)
         daily_data["Date"] = str(date)
     except:
         pass
@@ -57,7 +98,7 @@ def parse_html_type2(soup, html_file):
     # Extract date from filename
     try:
         span_text = soup.find_all('span', class_='date-widget')[0].text
-        date = parser.parse(span_text, fuzzy=True).date()
+        date = parse_date(span_text)
         daily_data["Date"] = str(date)
     except:
         pass
@@ -158,41 +199,157 @@ def retain_last_row(df, column):
 def is_blank_column(col):
     return col.isnull().all()
 
-def generate_dataframe():
+class Element:
+    # The parts of a BeautifulSoup tag the extractors use: find_all by name and class,
+    # parent, text, get_text, decompose and the class attribute
+    __slots__ = ('name', 'attrs', 'parent', 'contents')
+
+    def __init__(self, name, attrs, parent):
+        self.name = name
+        self.attrs = attrs
+        self.parent = parent
+        self.contents = []
+
+    def __getitem__(self, key):
+        return self.attrs[key]
+
+    def descendants(self):
+        stack = list(reversed(self.contents))
+        while stack:
+            node = stack.pop()
+            yield node
+            if isinstance(node, Element):
+                stack.extend(reversed(node.contents))
+
+    def find_all(self, name, class_=None):
+        return [node for node in self.descendants() if isinstance(node, Element) and node.name == name
+                and (class_ is None or class_ in node.attrs.get('class', ()))]
+
+    def get_text(self, strip=False):
+        strings = [node for node in self.descendants() if isinstance(node, str)]
+        if strip:
+            return ''.join(string.strip() for string in strings if string.strip())
+        return ''.join(strings)
+
+    @property
+    def text(self):
+        return self.get_text()
+
+    def decompose(self):
+        self.parent.contents = [node for node in self.parent.contents if node is not self]
+        self.parent = None
+
+def build_tree(html):
+    # Builds a tree of Elements the way html.parser and BeautifulSoup would: void and
+    # self-closing elements are never opened, and an end tag closes everything up to the
+    # last open tag of its name, or nothing if there is none
+    root = Element('[document]', {}, None)
+    stack = [root]
+    position = 0
+    for match in MARKUP.finditer(html):
+        if match.start() > position:
+            stack[-1].contents.append(unescape(html[position:match.start()]))
+        position = match.end()
+        closing, name, attributes = match.group(1), match.group(2), match.group(3)
+        if name is None:
+            continue
+        name = name.lower()
+        if closing:
+            for i in range(len(stack) - 1, 0, -1):
+                if stack[i].name == name:
+                    del stack[i:]
+                    break
+            continue
+
+        attrs = {}
+        if 'class' in attributes.lower():
+            for attribute, value in ATTRIBUTE.findall(attributes):
+                if attribute.lower() == 'class':
+                    attrs['class'] = unescape(value.strip('"\'')).split()
+        element = Element(name, attrs, stack[-1])
+        stack[-1].contents.append(element)
+        if name not in HTMLTreeBuilder.DEFAULT_EMPTY_ELEMENT_TAGS and not attributes.endswith('/'):
+            stack.append(element)
+    if position < len(html):
+        stack[-1].contents.append(unescape(html[position:]))
+    return root
+
+def parse_snapshot_fast(html, html_file):
+    # Reads the dashboard from a light tree of the page without its comments and scripts,
+    # left as declarations so the text around them stays split as BeautifulSoup splits it
+    if 'airport-col' not in html and 'paragraph' not in html:
+        return {}
+    tree = build_tree(IGNORED_MARKUP.sub('<!>', html))
+
+    daily_data = parse_html_type1(tree, html_file)
+    if len(daily_data.keys()) < 3:
+        daily_data = parse_html_type2(tree, html_file)
+
+    return daily_data
+
+def parse_snapshot(html_file, fast=True):
+    # Daily data of one snapshot, incomplete if it has no dashboard, or None if it can't be read
+    try:
+        with open(html_file, 'r', encoding='utf-8') as f:
+            html = f.read()
+    except:
+        return None
+
+    # The fast path covers the known layouts; anything it finds nothing in gets the full parse
+    if fast:
+        daily_data = parse_snapshot_fast(html, html_file)
+        if len(daily_data.keys()) >= 3:
+            return daily_data
+
+    try:
+        soup = BeautifulSoup(html, 'html.parser')
+    except:
+        return None
+
+    daily_data = parse_html_type1(soup, html_file)
+    if len(daily_data.keys()) < 3:
+        daily_data = parse_html_type2(soup, html_file)
+
+    return daily_data
+
+def parse_snapshots(html_files, jobs=None, fast=True):
+    # Yields (file, daily data) in the order of html_files; with more than one job, snapshots
+    # are parsed in separate processes, handed out in chunks and yielded as soon as they are done
+    if jobs == 1:
+        for html_file in html_files:
+            yield html_file, parse_snapshot(html_file, fast)
+        return
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        yield from zip(html_files, executor.map(parse_snapshot, html_files, repeat(fast), chunksize=SNAPSHOT_CHUNKSIZE))
+
+def generate_dataframe(jobs=None, fast=True):
     # Initialize an empty list to store extracted data
     extracted_data = []
 
     # Find all HTML files recursively
-    for html_file in glob(os.path.join(html_dir, "**/*.html"), recursive=True):
-        
-        print("Parsing {}".format(html_file))
+    html_files = glob(os.path.join(html_dir, "**/*.html"), recursive=True)
 
-        # Open the HTML file
-        try:
-            with open(html_file, 'r', encoding='utf-8') as f:
-                soup = BeautifulSoup(f, 'html.parser')
-        except:
-            continue
+    for html_file, daily_data in parse_snapshots(html_files, jobs, fast):
 
-        # Parse the HTML file
-        daily_data = {}
-        if len(daily_data.keys()) < 3:
-            daily_data = parse_html_type1(soup, html_file)
-        if len(daily_data.keys()) < 3:
-            daily_data = parse_html_type2(soup, html_file)
+        print("Parsing {}".format(html_file))
+        instrument.count('files')
 
-        # Save the HTML contents
-        if len(daily_data.keys()) < 3:
-            pass
+        if daily_data is None:
+            instrument.count('unreadable')
+        elif len(daily_data.keys()) < 3:
+            instrument.count('unparsed')
         else:
             extracted_data.append(daily_data)
 
+    instrument.count('rows_out', len(extracted_data))
+
     # Convert the list to a pandas DataFrame
     df = pd.DataFrame(extracted_data)
 
     return df
 
 def parse_dataframe(df):
+    instrument.count('rows_in', len(df))
     df = df.astype(str)
 
     # Rename column headers
@@ -250,7 +407,9 @@ def parse_dataframe(df):
     df = merge_columns(df, ['Passenger Load Factor (GoAir)', 'Passenger Load Factor (Goair)'], 'Passenger Load Factor (GoAir)')
     
     # Remove duplicate rows
+    rows = len(df)
     df = retain_last_row(df, 'Date')
+    instrument.dropped('duplicate dates', rows, len(df))
 
     # Remove commas
     df = df.apply(lambda x: x.str.replace(',', '') if isinstance(x, str) else x)
@@ -275,14 +434,50 @@ def parse_dataframe(df):
 def save_dataframe(df, output_file):
     df.to_csv(output_file, index=False)
 
+def save_parquet(df, output_file):
+    # Typed copy of the CSV, with Date as a date and every other column numeric
+    try:
+        import pyarrow
+    except ImportError:
+        print("pyarrow is not installed, skipping {}".format(output_file))
+        return
+
+    columns = {'Date': pd.to_datetime(df['Date'], errors='coerce').dt.date}
+    for col in df.columns.drop('Date'):
+        columns[col] = pd.to_numeric(df[col], errors='coerce')
+    typed_df = pd.DataFrame(columns).convert_dtypes(convert_string=False, convert_boolean=False)
+
+    typed_df.to_parquet(output_file, index=False)
+
 # Set up the directory path
 html_dir = "raw/civilaviation"
 
-# Generate initial DataFrame
-df = generate_dataframe()
+# Snapshots handed to a worker at a time, to amortise the cost of sending them
+SNAPSHOT_CHUNKSIZE = 16
+
+if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser(description="Parse the MCA daily traffic pages into aggregated/daily.csv")
+    arg_parser.add_argument("--jobs", type=int, default=None, help="Number of processes parsing snapshots (default: one per core, 1 parses in-process)")
+    arg_parser.add_argument("--full-parse", action="store_true", help="Parse every snapshot as a whole with html.parser, without the fast path")
+    arg_parser.add_argument("--report", default=None, help="Path of the JSON run report (default: .pipeline/reports/mca-parse-<time>.json)")
+    arg_parser.add_argument("--profile", choices=profiling.MODES, default=None, help="Profile each stage into .pipeline/profiles/, with cProfile or a stack sampler")
+    args = arg_parser.parse_args()
+
+    instrument.start("mca-parse", args.profile)
+    jobs = profiling.profiled_jobs(args.jobs)
+
+    # Generate initial DataFrame
+    with instrument.step("generate"):
+        df = generate_dataframe(jobs, not args.full_parse)
+
+    # Parse DataFrame
+    with instrument.step("parse"):
+        df = parse_dataframe(df)
+        instrument.count('rows_out', len(df))
 
-# Parse DataFrame
-df = parse_dataframe(df)
+    # Save DataFrame
+    with instrument.step("save"):
+        save_dataframe(df, '../aggregated/daily.csv')
+        save_parquet(df, '../aggregated/daily.parquet')
 
-# Save DataFrame
-save_dataframe(df, '../aggregated/daily.csv')
+    print("Run report written to {}".format(instrument.finish(args.report)))
@@ -0,0 +1,2 @@
+from pipeline.dag import Pipeline, Stage
+from pipeline.stages import build_stages
@@ -0,0 +1,33 @@
+import argparse
+import sys
+from pathlib import Path
+
+from pipeline.dag import Pipeline
+from pipeline.stages import build_stages
+
+ROOT = Path(__file__).resolve().parent.parent
+
+
+def main():
+    stages = build_stages()
+    parser = argparse.ArgumentParser(prog="python -m pipeline", description="Rebuild the datasets, running only the stages whose inputs changed")
+    parser.add_argument("targets", nargs="*", help=f"Stages to build, with their dependencies (default: all of {', '.join(stage.name for stage in stages)})")
+    parser.add_argument("--offline", action="store_true", help="Skip the stages that download data, and build from what is on disk")
+    parser.add_argument("--force", action="store_true", help="Run every selected stage, even if it is up to date")
+    parser.add_argument("--dry-run", action="store_true", help="Only report which stages would run")
+    parser.add_argument("--workers", type=int, default=2, help="Number of stages run at the same time")
+    parser.add_argument("--source", choices=["xlsx", "csv"], default="xlsx", help="Aggregate the DGCA workbooks directly, or convert them with parse.sh first")
+    args = parser.parse_args()
+
+    pipeline = Pipeline(ROOT, build_stages(args.source), workers=args.workers, offline=args.offline, force=args.force, dry_run=args.dry_run)
+    statuses = pipeline.run(args.targets)
+
+    for name in pipeline.stages:
+        if name in statuses:
+            print(f"{name}: {statuses[name]}")
+    if any(status in ("failed", "blocked") for status in statuses.values()):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
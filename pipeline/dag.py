@@ -0,0 +1,142 @@
+import json
+import os
+import subprocess
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from pathlib import Path
+
+from pipeline.fingerprint import fingerprint
+
+STATE_DIR = ".pipeline"
+STATE_FILE = "state.json"
+
+
+class Stage:
+    """One step of the pipeline: a command run in a directory, with declared inputs and outputs.
+
+    `inputs` and `outputs` are paths or glob patterns relative to the repository
+    root. A stage is up to date when the fingerprints of both match the ones
+    recorded after its last successful run. Stages marked `always` (the
+    fetchers, whose inputs are remote) run every time, unless they are `network`
+    stages and the pipeline runs offline.
+    """
+    def __init__(self, name: str, command: list, cwd: str, deps=(), inputs=(), outputs=(), always: bool = False, network: bool = False):
+        self.name = name
+        self.command = command
+        self.cwd = cwd
+        self.deps = list(deps)
+        self.inputs = list(inputs)
+        self.outputs = list(outputs)
+        self.always = always
+        self.network = network
+
+
+def load_state(path: Path) -> dict:
+    try:
+        with open(path, "r") as f:
+            return json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return {}
+
+
+def save_state(path: Path, state: dict):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(path.name + ".tmp")
+    with open(tmp_path, "w") as f:
+        json.dump(state, f, indent=2, sort_keys=True)
+    os.replace(tmp_path, path)
+
+
+def select(stages: dict, targets=None) -> dict:
+    """The target stages and everything they depend on, or every stage without targets."""
+    if not targets:
+        return dict(stages)
+    selected = {}
+    pending = list(targets)
+    while pending:
+        name = pending.pop()
+        if name not in stages:
+            raise KeyError(f"unknown stage {name}, expected one of {', '.join(stages)}")
+        if name not in selected:
+            selected[name] = stages[name]
+            pending += stages[name].deps
+    return {name: stage for name, stage in stages.items() if name in selected}
+
+
+class Pipeline:
+    """Runs a graph of stages, each as soon as its dependencies are done, skipping those up to date.
+
+    Independent branches run concurrently on up to `workers` threads. Each stage's
+    output goes to its own log file under the state directory.
+    """
+    def __init__(self, root: Path, stages: list, workers: int = 2, offline: bool = False, force: bool = False, dry_run: bool = False):
+        self.root = Path(root)
+        self.stages = {stage.name: stage for stage in stages}
+        self.workers = workers
+        self.offline = offline
+        self.force = force
+        self.dry_run = dry_run
+        self.state_path = self.root / STATE_DIR / STATE_FILE
+        self.state = load_state(self.state_path)
+        self.lock = threading.Lock()
+
+    def is_up_to_date(self, stage: Stage) -> bool:
+        if self.force or stage.always:
+            return False
+        recorded = self.state.get(stage.name)
+        if recorded is None or recorded["inputs"] is None:
+            return False
+        return (recorded["inputs"] == fingerprint(self.root, stage.inputs)
+                and recorded["outputs"] == fingerprint(self.root, stage.outputs))
+
+    def run_stage(self, stage: Stage) -> str:
+        """Run a stage if needed, and return its status: skipped, offline, would run, done or failed."""
+        if stage.network and self.offline:
+            return "offline"
+        if self.is_up_to_date(stage):
+            return "skipped"
+        if self.dry_run:
+            return "would run"
+
+        log_path = self.root / STATE_DIR / "logs" / f"{stage.name}.log"
+        log_path.parent.mkdir(parents=True, exist_ok=True)
+        inputs = fingerprint(self.root, stage.inputs)
+        print(f"[{stage.name}] running {' '.join(stage.command)}")
+        start = time.time()
+        with open(log_path, "w") as log:
+            result = subprocess.run(stage.command, cwd=self.root / stage.cwd, stdout=log, stderr=subprocess.STDOUT)
+        if result.returncode != 0:
+            print(f"[{stage.name}] failed with exit code {result.returncode}, see {log_path}")
+            return "failed"
+
+        print(f"[{stage.name}] done in {time.time() - start:.1f}s")
+        with self.lock:
+            self.state[stage.name] = {"inputs": inputs, "outputs": fingerprint(self.root, stage.outputs)}
+            save_state(self.state_path, self.state)
+        return "done"
+
+    def run(self, targets=None) -> dict:
+        """Run the targets and their dependencies, and return the status of every stage."""
+        stages = select(self.stages, targets)
+        statuses = {}
+        running = {}
+
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            while len(statuses) < len(stages):
+                for name, stage in stages.items():
+                    if name in statuses or name in running.values():
+                        continue
+                    deps = [statuses.get(dep) for dep in stage.deps if dep in stages]
+                    if any(status in ("failed", "blocked") for status in deps):
+                        statuses[name] = "blocked"
+                    elif all(status is not None for status in deps):
+                        running[executor.submit(self.run_stage, stage)] = name
+
+                if not running:
+                    continue
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    statuses[running.pop(future)] = future.result()
+
+        return statuses
@@ -0,0 +1,39 @@
+import glob
+import hashlib
+import os
+from pathlib import Path
+
+# Never part of a fingerprint: bytecode, and caches the stages keep for themselves
+IGNORED_DIRS = {'__pycache__', '.git', 'node_modules', 'cache'}
+IGNORED_SUFFIXES = ('.pyc', '.tmp', '.part', '.part.json')
+
+
+def expand(root: Path, pattern: str) -> list:
+    """Files matched by a path or glob pattern relative to root; directories are walked recursively."""
+    files = []
+    for match in sorted(glob.glob(str(root / pattern), recursive=True)):
+        if os.path.isdir(match):
+            for directory, dirs, names in os.walk(match):
+                dirs[:] = sorted(d for d in dirs if d not in IGNORED_DIRS)
+                files += [os.path.join(directory, name) for name in sorted(names)]
+        else:
+            files.append(match)
+    return [f for f in files if not f.endswith(IGNORED_SUFFIXES)]
+
+
+def fingerprint(root: Path, patterns: list) -> str | None:
+    """Digest of the path, size and mtime of every file matched by patterns, or None if one matches nothing.
+
+    Only metadata is hashed, so fingerprinting a large raw corpus costs a stat per file.
+    """
+    digest = hashlib.sha256()
+    for pattern in patterns:
+        files = expand(root, pattern)
+        if not files:
+            return None
+        digest.update(pattern.encode())
+        for path in files:
+            stat = os.stat(path)
+            relative = Path(path).relative_to(root).as_posix()
+            digest.update(f"{relative}\0{stat.st_size}\0{stat.st_mtime_ns}\n".encode())
+    return digest.hexdigest()
@@ -0,0 +1,207 @@
+"""Lightweight run reports for the build scripts.
+
+A script starts a report, wraps its stages and sub-steps in `step()`, and
+records counts as it goes:
+
+    instrument.start("aggregate")
+    with instrument.step("domestic/city"):
+        instrument.count("files", len(raw_files))
+        instrument.dropped("required columns", before, after)
+    instrument.finish()
+
+Every step records its wall time, its CPU time and that of worker processes,
+and the peak RSS of the process so far. Two opt-in measures give the peak of
+each step on its own: PIPELINE_TRACEMALLOC traces Python allocations, and
+PIPELINE_RSS_INTERVAL samples the resident memory of the process and its
+workers every that many seconds (Linux only). `finish` writes the nested steps as JSON under
+.pipeline/reports/, or to the path in PIPELINE_REPORT. Without a started report
+every call is a no-op, so library code can be instrumented unconditionally.
+With profiling enabled (see pipeline.profiling), each top-level step is also
+profiled on its own.
+"""
+import json
+import os
+import resource
+import sys
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager, nullcontext
+from pathlib import Path
+
+from pipeline import profiling
+
+ROOT = Path(__file__).resolve().parent.parent
+REPORT_DIR = ROOT / ".pipeline" / "reports"
+
+_report = None
+_stack = []
+_sampler = None
+# Held while the sampler thread updates the open steps, and while a step closes
+_lock = threading.RLock()
+
+
+def peak_rss_mb() -> float:
+    # ru_maxrss is in kilobytes on Linux and in bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def children_cpu() -> float:
+    # CPU time of worker processes, once they have exited
+    usage = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return usage.ru_utime + usage.ru_stime
+
+
+def rss_pages(pid) -> int:
+    with open(f"/proc/{pid}/statm", "r") as f:
+        return int(f.read().split()[1])
+
+
+def current_rss_mb() -> float | None:
+    """Resident memory of this process and its direct children, such as pool workers; None without /proc."""
+    try:
+        pages = rss_pages("self")
+    except OSError:
+        return None
+    task_dir = f"/proc/{os.getpid()}/task"
+    for task in os.listdir(task_dir):
+        try:
+            with open(f"{task_dir}/{task}/children", "r") as f:
+                children = f.read().split()
+        except OSError:
+            continue
+        for child in children:
+            try:
+                pages += rss_pages(child)
+            except (OSError, ValueError):
+                # Exited since it was listed
+                pass
+    return pages * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+
+
+def record_peak(key: str, value: float | None):
+    # A peak of a step is also a peak of every step it is nested in
+    if value is None:
+        return
+    with _lock:
+        for step in _stack:
+            step[key] = max(step.get(key, 0.0), value)
+
+
+class RssSampler:
+    """Samples the resident memory every interval seconds, into the peak of the open steps."""
+    def __init__(self, interval: float):
+        self.interval = interval
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target=self.run, daemon=True)
+
+    def run(self):
+        while not self.stopped.wait(self.interval):
+            record_peak("_rss_peak", current_rss_mb())
+
+    def start(self):
+        self.thread.start()
+
+    def stop(self):
+        self.stopped.set()
+        self.thread.join()
+
+
+def new_step(name: str) -> dict:
+    return {"name": name, "counters": {}, "dropped": {}, "steps": [],
+            "_wall": time.perf_counter(), "_cpu": time.process_time(), "_children_cpu": children_cpu()}
+
+
+def close_step(step: dict):
+    step["wall_s"] = round(time.perf_counter() - step.pop("_wall"), 4)
+    step["cpu_s"] = round(time.process_time() - step.pop("_cpu"), 4)
+    step["children_cpu_s"] = round(children_cpu() - step.pop("_children_cpu"), 4)
+    step["peak_rss_mb"] = peak_rss_mb()
+    if _sampler is not None:
+        peak = max(step.pop("_rss_peak", 0.0), current_rss_mb() or 0.0)
+        step["rss_peak_mb"] = round(peak, 1)
+        record_peak("_rss_peak", peak)
+    if tracemalloc.is_tracing():
+        peak = max(step.pop("_traced_peak", 0), tracemalloc.get_traced_memory()[1])
+        step["tracemalloc_peak_mb"] = round(peak / (1024 * 1024), 1)
+        record_peak("_traced_peak", peak)
+
+
+def start(name: str, profile: str | None = None):
+    """Start the run report of a script, profiling its stages with the given or PIPELINE_PROFILE mode."""
+    global _report, _sampler
+    profiling.enable(name, profile)
+    if os.environ.get("PIPELINE_TRACEMALLOC"):
+        tracemalloc.start()
+    _report = new_step(name)
+    _report["started_at"] = time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime())
+    _report["argv"] = sys.argv
+    _stack[:] = [_report]
+    interval = os.environ.get("PIPELINE_RSS_INTERVAL")
+    if interval and current_rss_mb() is not None:
+        _sampler = RssSampler(float(interval))
+        _sampler.start()
+
+
+@contextmanager
+def step(name: str):
+    """Record a stage or sub-step, nested in the step that is currently open."""
+    if _report is None:
+        yield
+        return
+    current = new_step(name)
+    _stack[-1]["steps"].append(current)
+    if tracemalloc.is_tracing():
+        # Keep the peak so far for the enclosing steps, and measure this one from here
+        record_peak("_traced_peak", tracemalloc.get_traced_memory()[1])
+        tracemalloc.reset_peak()
+    _stack.append(current)
+    # Top-level steps are the stages that get a profile each
+    profiled = profiling.stage(name) if len(_stack) == 2 else nullcontext()
+    try:
+        with profiled:
+            yield
+    finally:
+        with _lock:
+            _stack.pop()
+            close_step(current)
+
+
+def count(key: str, value: int = 1):
+    """Add to a counter of the current step, such as files, rows_in or rows_out."""
+    if _report is not None:
+        counters = _stack[-1]["counters"]
+        counters[key] = counters.get(key, 0) + int(value)
+
+
+def dropped(name: str, before: int, after: int):
+    """Record the rows a filter of the current step dropped."""
+    if _report is not None:
+        filters = _stack[-1]["dropped"]
+        filters[name] = filters.get(name, 0) + int(before) - int(after)
+
+
+def finish(path=None) -> Path | None:
+    """Close the report and write it as JSON, returning its path."""
+    global _report, _sampler
+    if _report is None:
+        return None
+    report, _report = _report, None
+    if _sampler is not None:
+        _sampler.stop()
+    _stack.clear()
+    close_step(report)
+    _sampler = None
+    if tracemalloc.is_tracing():
+        tracemalloc.stop()
+
+    path = path or os.environ.get("PIPELINE_REPORT")
+    if path is None:
+        REPORT_DIR.mkdir(parents=True, exist_ok=True)
+        path = REPORT_DIR / "{}-{}.json".format(report["name"], report["started_at"].replace(":", ""))
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "w") as f:
+        json.dump(report, f, indent=2)
+    return path
@@ -0,0 +1,166 @@
+"""Opt-in profiles of the stages of a run, recorded through pipeline.instrument.
+
+With a profiling mode enabled, every top-level `instrument.step` is profiled on
+its own, and written under .pipeline/profiles/<run>-<time>/ (or
+PIPELINE_PROFILE_DIR) as:
+
+- cprofile: deterministic; <stage>.pstats, for pstats or snakeviz, and
+  <stage>.collapsed, stacks rebuilt from the caller graph
+- sample: a thread samples the stack every PIPELINE_PROFILE_INTERVAL seconds
+  (default 0.005); <stage>.collapsed only, with far less overhead
+
+.collapsed files hold one "frame;frame;frame weight" line per stack, as read
+by flamegraph.pl and speedscope. Only the main process is profiled, not the
+workers of a process pool.
+"""
+import cProfile
+import os
+import pstats
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+PROFILE_DIR = ROOT / ".pipeline" / "profiles"
+MODES = ("cprofile", "sample")
+DEFAULT_INTERVAL = 0.005
+MAX_DEPTH = 64
+MIN_SECONDS = 0.0001
+
+_directory = None
+_mode = None
+
+
+def enable(run_name: str, mode: str | None = None):
+    """Profile the stages of this run with mode, or the PIPELINE_PROFILE mode if None; off if neither."""
+    global _directory, _mode
+    mode = mode or os.environ.get("PIPELINE_PROFILE")
+    if not mode:
+        return
+    if mode not in MODES:
+        raise ValueError(f"unknown profiling mode {mode}, expected one of {', '.join(MODES)}")
+    base = Path(os.environ.get("PIPELINE_PROFILE_DIR", PROFILE_DIR))
+    _directory = base / "{}-{}".format(run_name, time.strftime("%Y%m%dT%H%M%SZ", time.gmtime()))
+    _directory.mkdir(parents=True, exist_ok=True)
+    _mode = mode
+
+
+def is_enabled() -> bool:
+    return _mode is not None
+
+
+def profiled_jobs(jobs: int | None) -> int | None:
+    """Worker processes to parse with while profiling, which only sees this process.
+
+    Parsing runs in-process unless a number of jobs was asked for explicitly, in
+    which case the profiles mostly show this process waiting on its workers.
+    """
+    if not is_enabled():
+        return jobs
+    if jobs is None:
+        print("Profiling: parsing in-process, pass --jobs N to profile with worker processes instead")
+        return 1
+    if jobs != 1:
+        print(f"Profiling: only this process is profiled, the work of the {jobs} worker processes will not show")
+    return jobs
+
+
+def frame_name(filename: str, line: int, function: str) -> str:
+    return f"{function} ({os.path.basename(filename)}:{line})"
+
+
+def write_collapsed(path: Path, stacks: Counter):
+    with open(path, "w") as f:
+        for stack, weight in sorted(stacks.items()):
+            if weight > 0:
+                f.write(f"{stack} {weight}\n")
+
+
+def collapse_pstats(stats: pstats.Stats) -> Counter:
+    """Approximate stacks from cProfile's caller graph, weighted by microseconds of own time.
+
+    cProfile only records caller and callee pairs, so the time of a function is
+    split between its callers in proportion to the time spent under each.
+    Recursive calls are folded into the outer call, and negligible paths pruned.
+    """
+    entries = stats.stats
+    callees = {}
+    for function, (_, _, _, _, callers) in entries.items():
+        for caller, (_, _, _, cumulative) in callers.items():
+            callees.setdefault(caller, []).append((function, cumulative))
+
+    stacks = Counter()
+
+    def walk(function, share, path, seen):
+        _, _, own, cumulative, _ = entries[function]
+        if cumulative * share < MIN_SECONDS or len(seen) >= MAX_DEPTH:
+            return
+        stack = path + [frame_name(*function)]
+        stacks[";".join(stack)] += int(own * share * 1e6)
+        for callee, edge_cumulative in callees.get(function, []):
+            if callee not in seen and entries[callee][3] > 0:
+                walk(callee, share * min(edge_cumulative / entries[callee][3], 1.0), stack, seen | {callee})
+
+    for function, (_, _, _, _, callers) in entries.items():
+        if not callers:
+            walk(function, 1.0, [], {function})
+    return stacks
+
+
+class Sampler:
+    """Samples the stack of one thread at a fixed interval, counting each distinct stack."""
+    def __init__(self, thread_id: int, interval: float):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target=self.run, daemon=True)
+
+    def run(self):
+        while not self.stopped.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            names = []
+            while frame is not None and len(names) < MAX_DEPTH:
+                code = frame.f_code
+                names.append(frame_name(code.co_filename, code.co_firstlineno, code.co_name))
+                frame = frame.f_back
+            if names:
+                self.stacks[";".join(reversed(names))] += 1
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.stopped.set()
+        self.thread.join()
+
+
+@contextmanager
+def stage(name: str):
+    """Profile one stage, if profiling is enabled."""
+    if _mode is None:
+        yield
+        return
+
+    filename = "".join(c if c.isalnum() or c in "-_." else "_" for c in name)
+    if _mode == "cprofile":
+        profiler = cProfile.Profile()
+        profiler.enable()
+        try:
+            yield
+        finally:
+            profiler.disable()
+            profiler.dump_stats(_directory / f"{filename}.pstats")
+            write_collapsed(_directory / f"{filename}.collapsed", collapse_pstats(pstats.Stats(profiler)))
+    else:
+        interval = float(os.environ.get("PIPELINE_PROFILE_INTERVAL", DEFAULT_INTERVAL))
+        sampler = Sampler(threading.get_ident(), interval)
+        try:
+            with sampler:
+                yield
+        finally:
+            write_collapsed(_directory / f"{filename}.collapsed", sampler.stacks)
@@ -0,0 +1,40 @@
+import sys
+
+from pipeline.dag import Stage
+
+PYTHON = sys.executable
+
+# Code of the DGCA table builders; a change in any of them rebuilds the aggregated tables
+DGCA_CODE = ["dgca/aggregate.py", "dgca/cache.py", "dgca/cleaning.py", "dgca/columnar.py", "dgca/database.py",
+             "dgca/domestic.py", "dgca/index.py", "dgca/international.py", "dgca/partition.py",
+             "dgca/schema.py", "dgca/utils.py"]
+
+DGCA_TABLES = ["aggregated/domestic/city.csv", "aggregated/domestic/carrier.csv",
+               "aggregated/international/city.csv", "aggregated/international/country.csv",
+               "aggregated/international/carrier.csv", "aggregated/international/carrier_quarterly.csv"]
+
+
+def build_stages(source: str = "xlsx") -> list:
+    """The DGCA and MCA pipelines, which are independent, and the viz data built from both."""
+    aggregate_deps = ["dgca-fetch"]
+    stages = [
+        Stage("dgca-initialize", [PYTHON, "initialize.py"], cwd="dgca",
+              inputs=["dgca/initialize.py"], outputs=["dgca/urls.txt"], always=True, network=True),
+        Stage("dgca-fetch", [PYTHON, "fetch.py"], cwd="dgca", deps=["dgca-initialize"],
+              inputs=["dgca/urls.txt", "dgca/fetch.py"], outputs=["dgca/raw/xlsx"], always=True, network=True),
+    ]
+    if source == "csv":
+        stages.append(Stage("dgca-parse", ["bash", "parse.sh"], cwd="dgca", deps=["dgca-fetch"],
+                            inputs=["dgca/raw/xlsx", "dgca/parse.sh"], outputs=["dgca/raw/csv"]))
+        aggregate_deps = ["dgca-parse"]
+    stages += [
+        Stage("dgca-aggregate", [PYTHON, "aggregate.py", "--source", source], cwd="dgca", deps=aggregate_deps,
+              inputs=[f"dgca/raw/{source}"] + DGCA_CODE, outputs=DGCA_TABLES),
+        Stage("mca-fetch", ["bash", "fetch.sh"], cwd="mca",
+              inputs=["mca/fetch.sh"], outputs=["mca/raw"], always=True, network=True),
+        Stage("mca-parse", [PYTHON, "parse.py"], cwd="mca", deps=["mca-fetch"],
+              inputs=["mca/raw", "mca/parse.py"], outputs=["aggregated/daily.csv"]),
+        Stage("viz-data", [PYTHON, "scripts/data.py"], cwd="viz", deps=["dgca-aggregate", "mca-parse"],
+              inputs=DGCA_TABLES + ["aggregated/daily.csv", "viz/scripts/data.py"], outputs=["viz/static/data"]),
+    ]
+    return stages
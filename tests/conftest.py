@@ -0,0 +1,50 @@
+import sys
+import threading
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+# The DGCA scripts import each other by module name, from their own folder
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT / "dgca"))
+sys.path.insert(0, str(ROOT))
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+    """Base handler of a stand-in server; every request is recorded on the server."""
+
+    def log_message(self, format, *args):
+        pass
+
+    def record(self, body: bytes = b""):
+        self.server.requests.append({"method": self.command, "path": self.path,
+                                     "headers": dict(self.headers), "body": body})
+
+    def respond(self, status: int, body: bytes = b"", headers: dict | None = None):
+        self.send_response(status)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        if status != 304:
+            self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        if status != 304:
+            self.wfile.write(body)
+
+
+@contextmanager
+def serve(handler):
+    """Run handler on a local port, yielding the server; its `requests` lists what it was sent."""
+    server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    server.requests = []
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield server
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def base_url(server) -> str:
+    host, port = server.server_address
+    return f"http://{host}:{port}"
@@ -0,0 +1,44 @@
+import csv
+
+from domestic import CITY_COLUMNS, merge_city_runs
+
+
+def write_run(path, rows):
+    with open(path, "w", newline="") as f:
+        csv.writer(f, lineterminator="\n").writerows(rows)
+    return path
+
+
+def row(year, month, city1, city2, pax):
+    return [year, month, city1, city2, pax, "0.00", "0.00", "0.00", "0.00", "0.00"]
+
+
+def test_merge_city_runs_interleaves_sorted_runs(tmp_path):
+    runs = [
+        write_run(tmp_path / "000000.csv", [row("2015", "01", "AGRA", "DELHI", "1.00"),
+                                            row("2015", "02", "DELHI", "MUMBAI", "2.00")]),
+        write_run(tmp_path / "000001.csv", [row("2015", "03", "AGRA", "DELHI", "3.00"),
+                                            row("2015", "01", "BENGALURU", "DELHI", "4.00")]),
+        write_run(tmp_path / "000002.csv", []),
+    ]
+    output = tmp_path / "city.csv"
+    merge_city_runs(runs, output)
+
+    with open(output, newline="") as f:
+        rows = list(csv.reader(f))
+    assert rows[0] == CITY_COLUMNS
+    assert [r[4] for r in rows[1:]] == ["1.00", "3.00", "4.00", "2.00"]
+
+
+def test_merge_city_runs_keeps_run_order_on_equal_keys(tmp_path):
+    # The same route and month in two files: the earlier file's row stays first, as in a single run
+    runs = [
+        write_run(tmp_path / "000000.csv", [row("2015", "01", "AGRA", "DELHI", "1.00")]),
+        write_run(tmp_path / "000001.csv", [row("2015", "01", "AGRA", "DELHI", "2.00")]),
+    ]
+    output = tmp_path / "city.csv"
+    merge_city_runs(runs, output)
+
+    with open(output, newline="") as f:
+        rows = list(csv.reader(f))
+    assert [r[4] for r in rows[1:]] == ["1.00", "2.00"]
@@ -0,0 +1,87 @@
+import hashlib
+import json
+
+import pytest
+
+import fetch
+from conftest import StandInHandler, base_url, serve
+
+CONTENT = bytes(range(256)) * 400
+ETAG = '"workbook-v1"'
+
+
+class S3Handler(StandInHandler):
+    """Serves one object, honouring conditional and If-Range requests like S3 does."""
+    content = CONTENT
+    etag = ETAG
+
+    def do_GET(self):
+        self.record()
+        if self.headers.get("If-None-Match") == self.etag:
+            self.respond(304, headers={"ETag": self.etag})
+            return
+        requested = self.headers.get("Range")
+        if requested and self.headers.get("If-Range") == self.etag:
+            start = int(requested.split("=")[1].rstrip("-"))
+            self.respond(206, self.content[start:], {"ETag": self.etag,
+                         "Content-Range": f"bytes {start}-{len(self.content) - 1}/{len(self.content)}"})
+        else:
+            self.respond(200, self.content, {"ETag": self.etag})
+
+
+def interrupted(dest, received: int, etag: str):
+    """Leave the .part files of a download interrupted after `received` bytes."""
+    dest.parent.mkdir(parents=True, exist_ok=True)
+    dest.with_name(dest.name + ".part").write_bytes(CONTENT[:received])
+    dest.with_name(dest.name + ".part.json").write_text(json.dumps({"etag": etag, "last_modified": None}))
+
+
+@pytest.fixture
+def session():
+    return fetch.make_session(1)
+
+
+def test_download_resumes_interrupted_part(tmp_path, session):
+    dest = tmp_path / "domestic" / "IndiGo23.xlsx"
+    interrupted(dest, 1000, ETAG)
+    with serve(S3Handler) as server:
+        entry = fetch.download(session, base_url(server) + "/IndiGo23.xlsx", dest, None)
+
+    assert server.requests[0]["headers"]["Range"] == "bytes=1000-"
+    assert dest.read_bytes() == CONTENT
+    assert entry["sha256"] == hashlib.sha256(CONTENT).hexdigest()
+    assert not dest.with_name(dest.name + ".part").exists()
+    assert not dest.with_name(dest.name + ".part.json").exists()
+
+
+def test_download_restarts_when_object_changed(tmp_path, session):
+    dest = tmp_path / "domestic" / "IndiGo23.xlsx"
+    # The part was fetched from an earlier version, so If-Range fails and the whole object is sent
+    interrupted(dest, 1000, '"workbook-v0"')
+    with serve(S3Handler) as server:
+        entry = fetch.download(session, base_url(server) + "/IndiGo23.xlsx", dest, None)
+
+    assert dest.read_bytes() == CONTENT
+    assert entry["size"] == len(CONTENT)
+
+
+def test_download_revalidates_unchanged_file(tmp_path, session):
+    dest = tmp_path / "domestic" / "IndiGo23.xlsx"
+    with serve(S3Handler) as server:
+        entry = fetch.download(session, base_url(server) + "/IndiGo23.xlsx", dest, None)
+        assert fetch.download(session, base_url(server) + "/IndiGo23.xlsx", dest, entry) is None
+
+    assert server.requests[1]["headers"]["If-None-Match"] == ETAG
+    assert dest.read_bytes() == CONTENT
+
+
+def test_main_exits_non_zero_when_a_download_fails(monkeypatch, tmp_path):
+    monkeypatch.chdir(tmp_path)
+    with serve(S3Handler) as server:
+        (tmp_path / "urls.txt").write_text(f"{base_url(server)}/domestic/IndiGo23.xlsx\nhttp://127.0.0.1:9/domestic/SpiceJet23.xlsx\n")
+        monkeypatch.setattr("sys.argv", ["fetch.py", "--output", "raw/xlsx", "--workers", "2"])
+        with pytest.raises(SystemExit) as exit:
+            fetch.main()
+
+    assert exit.value.code == "1 downloads failed"
+    assert (tmp_path / "raw" / "xlsx" / "domestic" / "IndiGo23.xlsx").read_bytes() == CONTENT
@@ -0,0 +1,120 @@
+import io
+from urllib.parse import parse_qs
+
+import pytest
+
+import initialize
+from cache import ResponseCache
+from conftest import StandInHandler, base_url, serve
+
+# Each content ID links to one workbook and to the next pages; 1003 links back to 1001
+PAGES = {
+    "1001": ["1002", "1003"],
+    "1002": ["1003"],
+    "1003": ["1001"],
+}
+
+
+def page(content_id: str) -> bytes:
+    links = " ".join(f'"yearly/259/{linked}/html"' for linked in PAGES[content_id])
+    return f"jsp/dgca/data/{content_id}.xlsx {links}".encode()
+
+
+class DgcaHandler(StandInHandler):
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers["Content-Length"]))
+        self.record(body)
+        content_id = parse_qs(body.decode())["contentId"][0]
+        etag = f'"{content_id}-v1"'
+        if self.headers.get("If-None-Match") == etag:
+            self.respond(304, headers={"ETag": etag})
+        else:
+            self.respond(200, page(content_id), {"ETag": etag})
+
+
+def crawl(cache):
+    limiter = initialize.TokenBucket(rate=1000, capacity=100)
+    return initialize.crawl_urls(initialize.new_crawl_state(["1001"]), limiter, workers=2, cache=cache)
+
+
+def test_crawl_follows_links_once(monkeypatch, tmp_path):
+    with serve(DgcaHandler) as server:
+        monkeypatch.setattr(initialize, "BASE_URL", base_url(server))
+        urls = crawl(ResponseCache(tmp_path / "responses"))
+
+    assert urls == {f"https://public-prd-dgca.s3.ap-south-1.amazonaws.com/data/{content_id}.xlsx" for content_id in PAGES}
+    # The cycle back to 1001 is not followed
+    requested = [parse_qs(request["body"].decode())["contentId"][0] for request in server.requests]
+    assert sorted(requested) == sorted(PAGES)
+
+
+def test_crawl_revalidates_stale_responses(monkeypatch, tmp_path):
+    with serve(DgcaHandler) as server:
+        monkeypatch.setattr(initialize, "BASE_URL", base_url(server))
+        first = crawl(ResponseCache(tmp_path / "responses"))
+        server.requests.clear()
+        # With no TTL every cached response is stale, and revalidated with its ETag
+        second = crawl(ResponseCache(tmp_path / "responses", ttl=0))
+
+    assert second == first
+    assert len(server.requests) == len(PAGES)
+    assert all(request["headers"].get("If-None-Match") for request in server.requests)
+
+
+def test_crawl_answers_fresh_responses_from_cache(monkeypatch, tmp_path):
+    with serve(DgcaHandler) as server:
+        monkeypatch.setattr(initialize, "BASE_URL", base_url(server))
+        first = crawl(ResponseCache(tmp_path / "responses"))
+        server.requests.clear()
+        second = crawl(ResponseCache(tmp_path / "responses"))
+
+    assert second == first
+    assert server.requests == []
+
+
+def test_cache_get_survives_concurrent_eviction(monkeypatch, tmp_path):
+    cache = ResponseCache(tmp_path / "responses")
+    cache.put("1001", "fetchRulebookContentDtlsList", "body")
+
+    # Another worker's evict() removes the entry between reading it and touching it
+    def evicted(path, *args, **kwargs):
+        raise FileNotFoundError(path)
+    monkeypatch.setattr("cache.os.utime", evicted)
+
+    assert cache.get("1001", "fetchRulebookContentDtlsList") is None
+
+
+class FlakyHandler(DgcaHandler):
+    """Answers 503 for the content IDs in `down`."""
+    down = set()
+
+    def do_POST(self):
+        length = int(self.headers["Content-Length"])
+        body = self.rfile.read(length)
+        if parse_qs(body.decode())["contentId"][0] in self.down:
+            self.record(body)
+            self.respond(503)
+            return
+        self.rfile = io.BytesIO(body)
+        super().do_POST()
+
+
+def test_failed_pages_stay_queued_in_checkpoint(monkeypatch, tmp_path):
+    checkpoint = tmp_path / "checkpoint.json"
+    limiter = initialize.TokenBucket(rate=1000, capacity=100)
+    monkeypatch.setattr(FlakyHandler, "down", {"1002"})
+    with serve(FlakyHandler) as server:
+        monkeypatch.setattr(initialize, "BASE_URL", base_url(server))
+        with pytest.raises(initialize.CrawlIncomplete):
+            initialize.crawl_urls(initialize.new_crawl_state(["1001"]), limiter, workers=2, checkpoint=checkpoint)
+
+        state = initialize.load_checkpoint(checkpoint)
+        assert [content_id for content_id, _ in state["frontier"]] == ["1002"]
+
+        # Once DGCA is back, the next run only requests the failed page
+        monkeypatch.setattr(FlakyHandler, "down", set())
+        server.requests.clear()
+        urls = initialize.crawl_urls(state, limiter, workers=2, checkpoint=checkpoint)
+
+    assert [parse_qs(request["body"].decode())["contentId"][0] for request in server.requests] == ["1002"]
+    assert urls == {f"https://public-prd-dgca.s3.ap-south-1.amazonaws.com/data/{content_id}.xlsx" for content_id in PAGES}
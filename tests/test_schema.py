@@ -0,0 +1,23 @@
+import pandas as pd
+
+from schema import apply_schema, restore_integers
+
+
+def test_whole_number_measures_are_integers_once_title_rows_are_filtered():
+    # An integer-only measure column next to a fractional one, below the title and header rows
+    df = pd.DataFrame([["MONTHLY STATISTICS OF INDIGO FOR 2015", None, None],
+                       ["MONTH", "AIRCRAFT NUMBER", "AIRCRAFT HOURS"],
+                       ["JANUARY", 204, 32.83],
+                       ["FEBRUARY", "-", 1059]])
+    df = apply_schema(df, "carrier")
+    assert df[1].dtype == "float64"
+
+    months = restore_integers(df.iloc[2:].copy(), [1, 2])
+    assert list(months.dtypes) == [object, "int64", "float64"]
+    assert months.to_csv(index=False, header=False, float_format="{:.3f}".format) == \
+        "JANUARY,204,32.830\nFEBRUARY,0,1059.000\n"
+
+
+def test_columns_with_missing_values_stay_floats():
+    df = pd.DataFrame({1: [204.0, float("nan")]})
+    assert restore_integers(df, [1])[1].dtype == "float64"
@@ -0,0 +1,23 @@
+import pandas as pd
+
+from bench.corpus import CARRIER_SECTIONS
+from utils import append_columns
+
+
+def carrier_sheet(sections):
+    rows = [["MONTHLY STATISTICS OF INDIGO FOR 2015"] + [None] * 3, [None] * 4]
+    for section in sections:
+        rows.append([section] + [None] * 3)
+        rows.append(["MONTH", "COLUMN 0", "COLUMN 1", "COLUMN 2"])
+        rows.append(["JANUARY", 1, 2, 3])
+    return pd.DataFrame(rows)
+
+
+def test_carrier_sections_are_labelled_by_their_own_header():
+    entry = {"kind": "carrier", "folder": "domestic", "year": "2015", "airline": "indigo"}
+    df = append_columns(carrier_sheet(CARRIER_SECTIONS), entry)
+
+    months = df[df[0] == "JANUARY"]
+    assert list(months["Type"]) == ["ScheduledDomestic", "ScheduledInternational",
+                                    "NonScheduledDomestic", "NonScheduledInternational"]
+    assert df["Type"].iloc[:2].isna().all()
@@ -2,14 +2,20 @@
 """
 Convert CSV files to optimized JSON files with pre-calculated aggregations for frontend.
 """
+import argparse
 import csv
 import json
 import os
 import re
+import sys
 from pathlib import Path
 from collections import defaultdict
 from datetime import datetime
 
+# pipeline/ is a package at the repository root, two folders up from this script
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..'))
+from pipeline import instrument, profiling
+
 # Base paths
 PROJECT_ROOT = Path(__file__).parent.parent.parent
 AGGREGATED_DIR = PROJECT_ROOT / "aggregated"
@@ -746,21 +752,46 @@ def main():
     ensure_output_dir()
     
     # Convert base data
-    domestic_city = convert_domestic_city()
-    international_city = convert_international_city()
-    domestic_carrier = convert_domestic_carrier()
-    international_carrier = convert_international_carrier()
-    daily_data = convert_daily()
+    with instrument.step("domestic-city"):
+        domestic_city = convert_domestic_city()
+        instrument.count("rows_out", len(domestic_city))
+    with instrument.step("international-city"):
+        international_city = convert_international_city()
+        instrument.count("rows_out", len(international_city))
+    with instrument.step("domestic-carrier"):
+        domestic_carrier = convert_domestic_carrier()
+        instrument.count("rows_out", len(domestic_carrier))
+    with instrument.step("international-carrier"):
+        international_carrier = convert_international_carrier()
+        instrument.count("rows_out", len(international_carrier))
+    with instrument.step("daily"):
+        daily_data = convert_daily()
+        instrument.count("rows_out", len(daily_data))
     
     # Pre-calculate aggregations
     if domestic_city and international_city:
-        precalculate_airport_aggregations(domestic_city, international_city)
+        with instrument.step("airport-aggregations"):
+            instrument.count("rows_in", len(domestic_city) + len(international_city))
+            precalculate_airport_aggregations(domestic_city, international_city)
     
     if domestic_carrier and international_carrier:
-        precalculate_airline_aggregations(domestic_carrier, international_carrier)
+        with instrument.step("airline-aggregations"):
+            instrument.count("rows_in", len(domestic_carrier) + len(international_carrier))
+            precalculate_airline_aggregations(domestic_carrier, international_carrier)
     
     print("Conversion complete!")
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Convert the aggregated tables into the JSON data of the visualisation")
+    parser.add_argument("--report", default=None, help="Path of the JSON run report (default: .pipeline/reports/viz-data-<time>.json)")
+    parser.add_argument("--profile", choices=profiling.MODES, default=None, help="Profile each stage into .pipeline/profiles/, with cProfile or a stack sampler")
+    parser.add_argument("--aggregated-dir", default=AGGREGATED_DIR, type=Path, help="Directory with the aggregated tables (default: aggregated/)")
+    parser.add_argument("--output-dir", default=OUTPUT_DIR, type=Path, help="Directory to write the JSON data into (default: viz/static/data/)")
+    args = parser.parse_args()
+    AGGREGATED_DIR = args.aggregated_dir
+    OUTPUT_DIR = args.output_dir
+
+    instrument.start("viz-data", args.profile)
     main()
+    print(f"Run report written to {instrument.finish(args.report)}")
 